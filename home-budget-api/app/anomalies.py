@@ -0,0 +1,114 @@
+import argparse
+import math
+from typing import Optional
+from sqlalchemy import select, func, delete
+from sqlalchemy.orm import Session
+
+from . import sharding
+from .archive import source
+from .config import settings
+from .models import Expense, SpendingStat
+
+# Per (user, category) running statistics, maintained with Welford's method so that
+# every expense write costs O(1) and nothing ever re-reads the history.
+
+def _stat(db: Session, user_id: int, category_id: Optional[int]) -> SpendingStat:
+    for pending in db.new:
+        if isinstance(pending, SpendingStat) and (pending.user_id, pending.category_id) == (user_id, category_id):
+            return pending
+    category = SpendingStat.category_id == category_id if category_id is not None else SpendingStat.category_id.is_(None)
+    stat = db.execute(
+        select(SpendingStat).where(SpendingStat.user_id == user_id, category).with_for_update()
+    ).scalar()
+    if stat is None:
+        stat = SpendingStat(user_id=user_id, category_id=category_id, count=0, mean=0.0, m2=0.0)
+        db.add(stat)
+    return stat
+
+def _add(stat: SpendingStat, x: int) -> None:
+    stat.count += 1
+    delta = x - stat.mean
+    stat.mean += delta / stat.count
+    stat.m2 += delta * (x - stat.mean)
+
+def _remove(stat: SpendingStat, x: int) -> None:
+    if stat.count <= 1:
+        stat.count, stat.mean, stat.m2 = 0, 0.0, 0.0
+        return
+    mean = (stat.count * stat.mean - x) / (stat.count - 1)
+    stat.m2 = max(0.0, stat.m2 - (x - stat.mean) * (x - mean))
+    stat.mean = mean
+    stat.count -= 1
+
+def z_score(stat: SpendingStat, x: int) -> Optional[float]:
+    if stat.count < max(2, settings.ANOMALY_MIN_SAMPLES):
+        return None
+    std = math.sqrt(stat.m2 / (stat.count - 1))
+    if std == 0:
+        return None
+    return (x - stat.mean) / std
+
+def record_expense(db: Session, expense: Expense) -> None:
+    """Score a new expense against its history, then fold it into the statistics."""
+    stat = _stat(db, expense.user_id, expense.category_id)
+    expense.anomaly_z = z_score(stat, expense.amount_cents)
+    _add(stat, expense.amount_cents)
+
+def forget_expense(db: Session, user_id: int, category_id: Optional[int], amount_cents: int) -> None:
+    _remove(_stat(db, user_id, category_id), amount_cents)
+
+def rebuild_stats(db: Session, user_id: Optional[int] = None) -> int:
+    """Recompute every SpendingStat row from the full history (hot + archive)."""
+    src = source(Expense, True, ["user_id", "category_id", "amount_cents"])
+    where = [src.c.user_id == user_id] if user_id is not None else []
+    means = (
+        select(src.c.user_id, src.c.category_id, func.count().label("n"), func.avg(src.c.amount_cents).label("mean"))
+        .where(*where)
+        .group_by(src.c.user_id, src.c.category_id)
+        .subquery()
+    )
+    m2 = (
+        select(src.c.user_id, src.c.category_id,
+               func.sum((src.c.amount_cents - means.c.mean) * (src.c.amount_cents - means.c.mean)).label("m2"))
+        .join(means, (src.c.user_id == means.c.user_id)
+              & ((src.c.category_id == means.c.category_id)
+                 | (src.c.category_id.is_(None) & means.c.category_id.is_(None))))
+        .where(*where)
+        .group_by(src.c.user_id, src.c.category_id)
+        .subquery()
+    )
+    rows = db.execute(
+        select(means.c.user_id, means.c.category_id, means.c.n, means.c.mean, m2.c.m2)
+        .join(m2, (means.c.user_id == m2.c.user_id)
+              & ((means.c.category_id == m2.c.category_id)
+                 | (means.c.category_id.is_(None) & m2.c.category_id.is_(None))))
+    ).all()
+
+    db.execute(delete(SpendingStat).where(*([SpendingStat.user_id == user_id] if user_id is not None else [])))
+    db.add_all(
+        SpendingStat(user_id=r.user_id, category_id=r.category_id, count=r.n, mean=float(r.mean), m2=float(r.m2 or 0.0))
+        for r in rows
+    )
+    db.commit()
+    return len(rows)
+
+def rebuild_all(shards: sharding.ShardMap, user_id: Optional[int] = None) -> int:
+    targets = [shards.shard_for(user_id)] if user_id is not None else range(len(shards.engines))
+    total = 0
+    for i in targets:
+        with shards.session(i) as db:
+            total += rebuild_stats(db, user_id)
+    return total
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Spending anomaly statistics.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    rebuild = sub.add_parser("rebuild", help="recompute running statistics from expense history")
+    rebuild.add_argument("--user-id", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    sharding.shard_map.init_all()
+    print(f"rebuilt {rebuild_all(sharding.shard_map, args.user_id)} statistics rows")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+import argparse
+import heapq
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Iterable, List, Optional
+from sqlalchemy import select, delete, func, union_all
+from sqlalchemy.orm import Session
+
+from .config import settings
+from .models import Expense, Income, ExpenseArchive, IncomeArchive, ArchiveState
+
+ARCHIVES = ((Expense, ExpenseArchive), (Income, IncomeArchive))
+
+def _naive_utc(dt: datetime) -> datetime:
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+def archive_horizon(db: Session) -> Optional[datetime]:
+    horizon = db.execute(select(ArchiveState.archived_before).where(ArchiveState.id == 1)).scalar()
+    return _naive_utc(horizon) if horizon else None
+
+def reaches_archive(horizon: Optional[datetime], date_from: Optional[datetime]) -> bool:
+    if horizon is None:
+        return False
+    return date_from is None or _naive_utc(date_from) < horizon
+
+def needs_archive(db: Session, date_from: Optional[datetime]) -> bool:
+    return reaches_archive(archive_horizon(db), date_from)
+
+def _columns(model, archive):
+    return [c.name for c in archive.__table__.columns if c.name in model.__table__.columns]
+
+def source(model, with_archive: bool, names: Optional[List[str]] = None):
+    """The Expense/Income table, or its union with the archive table when with_archive is set.
+
+    `names` narrows the union to those columns (migrations run before later columns exist).
+    """
+    if not with_archive:
+        return model.__table__
+    archive = dict(ARCHIVES)[model]
+    cols = names or _columns(model, archive)
+    hot = select(*[model.__table__.c[name] for name in cols])
+    cold = select(*[archive.__table__.c[name] for name in cols])
+    return union_all(hot, cold).subquery(model.__tablename__)
+
+def find_archived(db: Session, model, id: int, user_id: int):
+    """The archived copy of a model row, for read-only lookups by id."""
+    archive = dict(ARCHIVES)[model]
+    return db.query(archive).filter(archive.id == id, archive.user_id == user_id).first()
+
+def unarchive(db: Session, model, id: int, user_id: int):
+    """Move an archived row back into the hot table (same id) so it can be updated or deleted.
+
+    The row then sits in the hot table below the horizon until the next archive run.
+    """
+    row = find_archived(db, model, id, user_id)
+    if row is None:
+        return None
+    hot = model(**{name: getattr(row, name) for name in _columns(model, dict(ARCHIVES)[model])})
+    db.delete(row)
+    db.add(hot)
+    db.flush()
+    return hot
+
+def newest_first(hot: Iterable, cold: Iterable, created_at: Callable) -> List:
+    # unarchived rows can be older than archived ones, so merge instead of concatenating
+    return list(heapq.merge(hot, cold, key=created_at, reverse=True))
+
+def _month_start(dt: datetime) -> datetime:
+    return dt.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+def _ensure_pg_partitions(db: Session, table: str, start: datetime, end: datetime) -> None:
+    month = _month_start(start)
+    while month <= end:
+        nxt = _month_start(month + timedelta(days=32))
+        db.connection().exec_driver_sql(
+            f"CREATE TABLE IF NOT EXISTS {table}_p{month:%Y%m} PARTITION OF {table} "
+            f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{nxt:%Y-%m-%d}')"
+        )
+        month = nxt
+
+def archive_old_rows(db: Session, before: datetime) -> dict:
+    before = _naive_utc(before)
+    moved = {}
+    for model, archive in ARCHIVES:
+        oldest = db.execute(select(func.min(model.created_at)).where(model.created_at < before)).scalar()
+        if oldest is None:
+            moved[model.__tablename__] = 0
+            continue
+        if db.get_bind().dialect.name == "postgresql":
+            _ensure_pg_partitions(db, archive.__tablename__, _naive_utc(oldest), before)
+
+        cols = _columns(model, archive)
+        db.execute(
+            archive.__table__.insert().from_select(
+                cols, select(*[model.__table__.c[name] for name in cols]).where(model.created_at < before)
+            )
+        )
+        moved[model.__tablename__] = db.execute(delete(model).where(model.created_at < before)).rowcount
+
+    raise_horizon(db, before)
+    db.commit()
+    return moved
+
+def raise_horizon(db: Session, before: datetime) -> None:
+    """Move the horizon up to before; it never goes down, queries below it read both tables."""
+    before = _naive_utc(before)
+    state = db.get(ArchiveState, 1)
+    horizon = before.replace(tzinfo=timezone.utc)
+    if state is None:
+        db.add(ArchiveState(id=1, archived_before=horizon))
+    elif _naive_utc(state.archived_before) < before:
+        state.archived_before = horizon
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Move old expenses/incomes into the archive tables.")
+    parser.add_argument("--days", type=int, default=settings.ARCHIVE_AFTER_DAYS,
+                        help="archive rows older than this many days")
+    args = parser.parse_args(argv)
+
+    from . import sharding  # sharding imports this module
+    shards = sharding.shard_map
+    shards.init_all()
+    before = datetime.now(timezone.utc) - timedelta(days=args.days)
+    for i in range(len(shards.engines)):
+        with shards.session(i) as db:
+            print(f"shard {i}: {archive_old_rows(db, before)}")
+
+if __name__ == "__main__":
+    main()
@@ -1,32 +1,74 @@
-from fastapi import Depends, HTTPException, status
+from typing import Optional
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 from ..core.security import verify_password
-from ..db import SessionLocal
+from .. import sharding
 from ..models import User
 from .jwt import decode_token
 
 oauth_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
-def get_db():
-    db = SessionLocal()
+def get_db(request: Request):
+    """Session on the authenticated user's shard (the directory for anonymous calls)."""
+    user_id = None
+    if sharding.shard_map.sharded:
+        sub = scope_subject(request.scope)
+        user_id = int(sub) if sub and sub.isdigit() else None
+    db = sharding.shard_map.session_for_user(user_id)
     try:
         yield db
     finally:
         db.close()
 
-def get_current_user(token:str = Depends(oauth_scheme), db: Session = Depends(get_db)) -> User:
+def get_directory_db():
+    """Session on the directory database: users, shard map, master category list."""
+    db = sharding.shard_map.Directory()
+    try:
+        yield db
+    finally:
+        db.close()
+
+def token_subject(token: str) -> Optional[str]:
+    """The JWT `sub` claim, or None for an invalid token. Raises nothing."""
+    from jose import JWTError
     try:
         payload = decode_token(token)
-    except ValueError:
+    except (JWTError, ValueError):
+        return None
+    sub = payload.get("sub")
+    return str(sub) if sub else None
+
+def scope_subject(scope) -> Optional[str]:
+    """token_subject() of the request's Bearer token, decoded once per request.
+
+    The result is cached in the ASGI scope state, so the rate limiter, get_db and
+    get_current_user share a single decode.
+    """
+    state = scope.setdefault("state", {})
+    if "token_subject" not in state:
+        sub = None
+        for name, value in scope["headers"]:
+            if name == b"authorization":
+                scheme, _, token = value.decode("latin-1").partition(" ")
+                sub = token_subject(token) if scheme.lower() == "bearer" else None
+                break
+        state["token_subject"] = sub
+    return state["token_subject"]
+
+def get_current_user(request: Request, token: str = Depends(oauth_scheme), db: Session = Depends(get_db)) -> User:
+    # `token` keeps the OpenAPI security scheme and the 401 for a missing header
+    user_id = scope_subject(request.scope)
+    if not user_id or not user_id.isdigit():
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
 
-    user_id = payload.get("sub")
-    if not user_id:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid Token Payload")
-    
     user = db.get(User, int(user_id))
-    if not user:
+    if user is None or user.away:
+        # routed by a placement cached before a move: the next request looks it up again
+        routed = sharding.shard_map.forget(int(user_id))
+        if user is not None or (routed is not None and sharding.shard_map.shard_for(int(user_id)) != routed):
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Account is being moved, retry",
+                                headers={"Retry-After": "1"})
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
     return user
     
\ No newline at end of file
@@ -3,15 +3,17 @@ from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from ..core.security import hash_password, verify_password
 from ..config import settings
+from ..money import to_cents
 from ..models import User
 from ..schemas.auth import RegisterIn, TokenOut
 from .jwt import create_access_token
-from .deps import get_db
+from .deps import get_directory_db
+from .. import sharding
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
 @router.post("/register", response_model=TokenOut, status_code=status.HTTP_201_CREATED)
-def register(payload: RegisterIn, db: Session = Depends(get_db)):
+def register(payload: RegisterIn, db: Session = Depends(get_directory_db)):
     exists = db.query(User).filter(User.email == payload.email).first()
     if exists:
         raise HTTPException(status_code=400, detail="Email already registered")
@@ -19,17 +21,19 @@ def register(payload: RegisterIn, db: Session = Depends(get_db)):
     user = User(
         email=payload.email,
         hashed_password=hash_password(payload.password),
-        balance=settings.INITIAL_BALANCE,
+        balance_cents=to_cents(settings.INITIAL_BALANCE),
     )
     db.add(user)
+    db.flush()
+    # the shard copy is written before the directory commits: no account without its shard row
+    sharding.place_user(sharding.shard_map, db, user)
     db.commit()
-    db.refresh(user)
 
     token = create_access_token({"sub": str(user.id)})
     return TokenOut(access_token=token)
 
 @router.post("/login", response_model=TokenOut)
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_directory_db)):
     user = db.query(User).filter(User.email == form_data.username).first()
     if not user or not verify_password(form_data.password, user.hashed_password):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
@@ -0,0 +1,77 @@
+import gzip
+from typing import Optional
+
+from .config import settings
+
+try:  # optional: pip install brotli
+    import brotli
+except ImportError:  # pragma: no cover - depends on the environment
+    brotli = None
+
+def _accepted(header: str) -> set:
+    accepted = set()
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        if params.strip().replace(" ", "") in ("q=0", "q=0.0"):
+            continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+class CompressionMiddleware:
+    """Compress buffered responses with brotli or gzip once they reach minimum_size bytes."""
+
+    def __init__(self, app, minimum_size: Optional[int] = None, brotli_enabled: Optional[bool] = None):
+        self.app = app
+        self.minimum_size = settings.COMPRESSION_MIN_SIZE if minimum_size is None else minimum_size
+        self.brotli_enabled = settings.COMPRESSION_BROTLI if brotli_enabled is None else brotli_enabled
+
+    def _coding(self, scope) -> Optional[str]:
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accepted = _accepted(value.decode("latin-1"))
+                if self.brotli_enabled and brotli is not None and "br" in accepted:
+                    return "br"
+                if "gzip" in accepted:
+                    return "gzip"
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.COMPRESSION_ENABLED:
+            return await self.app(scope, receive, send)
+        coding = self._coding(scope)
+        if coding is None:
+            return await self.app(scope, receive, send)
+
+        start = None
+        chunks = []
+
+        async def buffered_send(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                if message["status"] in (204, 304):
+                    # no body to compress; headers go out exactly as the app set them
+                    return await send(message)
+                start = message
+                return
+            if message["type"] != "http.response.body" or start is None:
+                return await send(message)
+            chunks.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+
+            body = b"".join(chunks)
+            if len(body) < self.minimum_size or any(k == b"content-encoding" for k, _ in start["headers"]):
+                await send(start)
+                await send({"type": "http.response.body", "body": body})
+                return
+            if coding == "br":
+                body = brotli.compress(body, quality=settings.COMPRESSION_BROTLI_QUALITY)
+            else:
+                body = gzip.compress(body, compresslevel=settings.COMPRESSION_GZIP_LEVEL)
+            headers = [(k, v) for k, v in start["headers"] if k != b"content-length"]
+            headers += [(b"content-encoding", coding.encode()), (b"vary", b"Accept-Encoding"),
+                        (b"content-length", str(len(body)).encode())]
+            await send({**start, "headers": headers})
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, buffered_send)
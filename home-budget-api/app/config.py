@@ -3,7 +3,34 @@ from pydantic_settings import BaseSettings, SettingsConfigDict
 class Settings(BaseSettings):
     SECRET_KEY: str = "change-me-in-.env"
     DATABASE_URL: str = "sqlite:///./budget.db"
+    # Optional user-data shards. DATABASE_URL then acts as the directory (users,
+    # shard map, master category list). Append only: a user's shard is its index here.
+    SHARD_URLS: list[str] = []
+    # shard i issues expense/income ids from i * SHARD_ID_SPAN, so a user's rows keep
+    # their ids when moved; 100M rows per shard keeps 21 shards inside a 32-bit id
+    SHARD_ID_SPAN: int = 100_000_000
+    SHARD_PLACEMENT_CACHE_SIZE: int = 100_000  # user -> shard entries kept in memory per process
     INITIAL_BALANCE: float = 1000.0
+    ARCHIVE_AFTER_DAYS: int = 365
+    ANOMALY_Z_THRESHOLD: float = 3.0
+    ANOMALY_MIN_SAMPLES: int = 5
+    DESCRIPTION_CACHE_SIZE: int = 10_000  # interned description ids kept in memory per process
+    IDEMPOTENCY_TTL_SECONDS: int = 24 * 3600
+    IDEMPOTENCY_SWEEP_INTERVAL_SECONDS: int = 3600  # 0 disables the in-process sweeper
+
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_CAPACITY: float = 60.0
+    RATE_LIMIT_REFILL_PER_SECOND: float = 1.0
+    # path prefix -> tokens per request; anything unlisted costs 1
+    RATE_LIMIT_COSTS: dict[str, float] = {"/analytics": 7.0, "/sync": 5.0}
+    RATE_LIMIT_BACKEND: str = "memory"  # memory | sqlite
+    RATE_LIMIT_SQLITE_PATH: str = "./ratelimit.db"
+
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MIN_SIZE: int = 1024  # bytes; smaller responses go out as-is
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI: bool = True  # used only when the optional `brotli` package is installed
+    COMPRESSION_BROTLI_QUALITY: int = 4
 
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8")
 
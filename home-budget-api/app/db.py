@@ -1,11 +1,39 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, select, delete, inspect
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.orm import sessionmaker
 from .config import settings
-from .models import Base  
+from .models import Base, SchemaVersion
+
+# Bump whenever the models change; startup only touches the schema on mismatch.
+SCHEMA_VERSION = 13
 
 engine = create_engine(settings.DATABASE_URL, echo=True, future=True)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-def init_db() -> None:
-    from . import models
-    Base.metadata.create_all(bind=engine)
+def _stored_version(conn) -> int | None:
+    try:
+        return conn.execute(select(SchemaVersion.version)).scalar()
+    except DBAPIError:
+        # no schema_version table yet
+        conn.rollback()
+        return None
+
+def init_db(bind=None) -> bool:
+    bind = bind or engine
+    with bind.connect() as conn:
+        current = _stored_version(conn)
+        if current is not None and current >= SCHEMA_VERSION:
+            # equal, or written by newer code (e.g. mid rolling deploy): leave it alone
+            return False
+        if current is None and inspect(conn).has_table("user"):
+            current = 1  # created before schema versioning
+
+    from .migrations import MIGRATIONS
+    with bind.begin() as conn:
+        Base.metadata.create_all(bind=conn)
+        for version in range((current or SCHEMA_VERSION) + 1, SCHEMA_VERSION + 1):
+            if version in MIGRATIONS:
+                MIGRATIONS[version](conn)
+        conn.execute(delete(SchemaVersion))
+        conn.execute(SchemaVersion.__table__.insert().values(version=SCHEMA_VERSION))
+    return True
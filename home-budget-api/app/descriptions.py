@@ -0,0 +1,119 @@
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from .config import settings
+from .models import Description
+
+# Expense/Income descriptions are interned in the `description` table. The write
+# path resolves text -> (id, stored text) through an in-process LRU keyed by
+# (engine, description_key(text)), so every shard keeps its own ids. Ids inserted by a transaction wait in
+# session.info until it commits; a rolled-back id never reaches the cache.
+
+_PENDING = "pending_descriptions"
+
+class LRUCache:
+    def __init__(self, size: int):
+        self.size = size
+        self._data: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple) -> Optional[tuple]:
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def put(self, key: tuple, value: tuple) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.size:
+                self._data.popitem(last=False)
+
+    def pop(self, key: tuple) -> Optional[tuple]:
+        with self._lock:
+            return self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+cache = LRUCache(settings.DESCRIPTION_CACHE_SIZE)
+
+def normalize(text: str) -> str:
+    return " ".join(text.split())
+
+def description_key(text: str) -> str:
+    return normalize(text).lower()
+
+def _insert_returning(db: Session, text: str, key: str):
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        return None
+    return (insert(Description).values(text=text, key=key)
+            .on_conflict_do_nothing(index_elements=[Description.key]).returning(Description.id))
+
+def _intern(db: Session, text: str) -> Tuple[int, str]:
+    text = normalize(text)
+    key = (db.get_bind(), text.lower())
+    found = cache.get(key)
+    if found is not None:
+        return found
+    pending = db.info.setdefault(_PENDING, {})
+    if key in pending:
+        return pending[key]
+
+    lookup = select(Description.id, Description.text).where(Description.key == key[1])
+    found = db.execute(lookup).first()
+    if found is None:
+        stmt = _insert_returning(db, text, key[1])
+        if stmt is None:
+            row = Description(text=text, key=key[1])
+            db.add(row)
+            db.flush()
+            inserted = row.id
+        else:
+            inserted = db.execute(stmt).scalar()
+        if inserted is not None:
+            pending[key] = (inserted, text)
+            return pending[key]
+        # a concurrent transaction inserted it first and has committed
+        found = db.execute(lookup).one()
+    found = tuple(found)
+    cache.put(key, found)
+    return found
+
+def intern_description(db: Session, text: str) -> int:
+    return _intern(db, text)[0]
+
+def describe(db: Session, text: str) -> Description:
+    """The Description row for text, for assigning to `description_ref`; loads nothing."""
+    id, text = _intern(db, text)
+    known = db.identity_map.get(db.identity_key(Description, id))
+    if known is not None:
+        return known
+    row = Description(id=id, text=text, key=text.lower())
+    make_transient_to_detached(row)
+    return db.merge(row, load=False)
+
+@event.listens_for(Session, "after_commit")
+def _promote_pending(session):
+    for key, id in session.info.pop(_PENDING, {}).items():
+        cache.put(key, id)
+
+@event.listens_for(Session, "after_transaction_end")
+def _drop_pending(session, transaction):
+    if transaction.parent is None:
+        session.info.pop(_PENDING, None)
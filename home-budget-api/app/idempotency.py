@@ -0,0 +1,132 @@
+import argparse
+import asyncio
+import hashlib
+import json
+from datetime import datetime, timedelta, UTC
+from typing import Any, Callable, Optional
+
+from fastapi import Depends, Header, HTTPException, Request, Response
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import delete
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from . import sharding
+from .auth.deps import get_db, get_current_user
+from .config import settings
+from .models import IdempotencyKey, User
+
+# Retried writes carrying the same Idempotency-Key get the first response back.
+# The key row is inserted in the same transaction as the domain writes, so it
+# exists exactly when they were committed; a concurrent duplicate loses on the
+# primary key at commit, rolls back and replays the winner. Error responses
+# are not stored: nothing was committed, so a retry simply runs again.
+
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+class Idempotency:
+    def __init__(self, db: Session, user_id: int, key: Optional[str], fingerprint: str):
+        self.db = db
+        self.user_id = user_id
+        self.key = key
+        self.fingerprint = fingerprint
+
+    def _response(self, row: IdempotencyKey, replayed: bool) -> Response:
+        headers = {REPLAYED_HEADER: "true"} if replayed else None
+        media_type = "application/json" if row.body is not None else None
+        return Response(content=row.body, status_code=row.status_code, headers=headers, media_type=media_type)
+
+    def _lookup(self) -> Optional[IdempotencyKey]:
+        row = self.db.get(IdempotencyKey, (self.user_id, self.key))
+        if row is None:
+            return None
+        if _aware(row.expires_at) <= datetime.now(UTC):
+            # expired: dropped together with the write that reuses the key
+            self.db.delete(row)
+            return None
+        if row.fingerprint != self.fingerprint:
+            raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different request")
+        return row
+
+    def replay(self) -> Optional[Response]:
+        """The stored response for this key, if the request was already handled."""
+        if self.key is None:
+            return None
+        row = self._lookup()
+        return self._response(row, replayed=True) if row is not None else None
+
+    def commit(self, status_code: int, body: Optional[Callable[[], Any]] = None) -> Optional[Response]:
+        """Commit the session, storing the response under the key in the same transaction.
+
+        Returns the response to send when a key was given (the stored one, or the
+        winner's after a concurrent duplicate), None otherwise.
+        """
+        if self.key is None:
+            self.db.commit()
+            return None
+        self.db.flush()
+        content = json.dumps(jsonable_encoder(body()), separators=(",", ":")).encode() if body else None
+        row = IdempotencyKey(
+            user_id=self.user_id, key=self.key, fingerprint=self.fingerprint, status_code=status_code, body=content,
+            expires_at=datetime.now(UTC) + timedelta(seconds=settings.IDEMPOTENCY_TTL_SECONDS),
+        )
+        self.db.add(row)
+        try:
+            self.db.commit()
+        except IntegrityError:
+            self.db.rollback()
+            winner = self._lookup()
+            if winner is None:
+                raise
+            return self._response(winner, replayed=True)
+        return self._response(row, replayed=False)
+
+def _aware(dt: datetime) -> datetime:
+    # SQLite hands back naive datetimes
+    return dt if dt.tzinfo else dt.replace(tzinfo=UTC)
+
+async def idempotency(
+    request: Request,
+    key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user),
+) -> Idempotency:
+    if key is not None and not 0 < len(key) <= 255:
+        raise HTTPException(status_code=400, detail="Idempotency-Key must be 1-255 characters")
+    digest = hashlib.sha256(f"{request.method} {request.url.path}\n".encode())
+    digest.update(await request.body())
+    return Idempotency(db, user.id, key, digest.hexdigest())
+
+def sweep_expired(db: Session, now: Optional[datetime] = None) -> int:
+    deleted = db.execute(
+        delete(IdempotencyKey).where(IdempotencyKey.expires_at <= (now or datetime.now(UTC)))
+    ).rowcount
+    db.commit()
+    return deleted
+
+def sweep_all(shards: sharding.ShardMap) -> int:
+    total = 0
+    for i in range(len(shards.engines)):
+        with shards.session(i) as db:
+            total += sweep_expired(db)
+    return total
+
+async def sweep_periodically(interval: float) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(sweep_all, sharding.shard_map)
+        except SQLAlchemyError:
+            pass  # a shard being down must not kill the sweeper; next round retries
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Idempotency key maintenance.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("sweep", help="delete expired idempotency keys on every shard")
+    parser.parse_args(argv)
+
+    sharding.shard_map.init_all()
+    print(f"deleted {sweep_all(sharding.shard_map)} expired keys")
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,22 @@
 from fastapi import FastAPI, HTTPException
 from .config import settings
-from .db import init_db, engine
+from .db import engine
 from .seed import seed_categories
+from . import sharding
+from .idempotency import sweep_periodically
 from sqlalchemy import inspect
+# routers stay eager: every route has to be registered before the first request,
+# so deferring them would only move their import cost, not remove it
 from .auth.routes import router as auth_router
 from .routers.categories import router as categories_router
 from .routers.expenses import router as expenses_router
 from .routers.analytics import router as analytics_router
 from .routers.incomes import router as incomes_router
-from contextlib import asynccontextmanager
+from .routers.sync import router as sync_router
+from .ratelimit import RateLimitMiddleware
+from .compression import CompressionMiddleware
+from contextlib import asynccontextmanager, suppress
+import asyncio
 
 tags_metadata = [
     {"name": "auth", "description": "Registracija i prijava korisnika. Vraća JWT (Bearer)."},
@@ -16,13 +24,22 @@ tags_metadata = [
     {"name": "expenses", "description": "CRUD nad troškovima + filteri."},
     {"name": "analytics", "description": "Sažeci potrošnje po periodu i kategoriji."},
     {"name": "incomes", "description": "CRUD nad prihodima (+ utječe na balance)."},
+    {"name": "sync", "description": "Delta sinkronizacija za offline klijente (cursor + tombstones)."},
 ]
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    init_db()
+    sharding.shard_map.init_all()
     seed_categories()
+    sharding.sync_categories(sharding.shard_map)
+    sweeper = None
+    if settings.IDEMPOTENCY_SWEEP_INTERVAL_SECONDS > 0:
+        sweeper = asyncio.create_task(sweep_periodically(settings.IDEMPOTENCY_SWEEP_INTERVAL_SECONDS))
     yield
+    if sweeper is not None:
+        sweeper.cancel()
+        with suppress(asyncio.CancelledError):
+            await sweeper
     
 
 app = FastAPI(
@@ -34,6 +51,8 @@ app = FastAPI(
     license_info={"name": "MIT"},
     lifespan=lifespan,
 )
+app.add_middleware(RateLimitMiddleware)
+app.add_middleware(CompressionMiddleware)
 
 
 @app.get("/health")
@@ -66,4 +85,5 @@ app.include_router(auth_router)
 app.include_router(categories_router)
 app.include_router(expenses_router)
 app.include_router(analytics_router)
-app.include_router(incomes_router)
\ No newline at end of file
+app.include_router(incomes_router)
+app.include_router(sync_router)
\ No newline at end of file
@@ -0,0 +1,141 @@
+from typing import Callable, Dict
+from sqlalchemy import Connection, Column, bindparam, delete, func, inspect, insert, select, update
+from sqlalchemy.orm import Session
+from sqlalchemy.schema import CreateColumn
+from .models import (
+    Expense, Income, Category, User, ExpenseArchive, IncomeArchive, Description, SpendingStat, SyncCounter,
+    CATEGORY_SEQ,
+)
+
+def add_column(conn: Connection, column: Column, default_sql: str | None = None) -> None:
+    # tables created by create_all in the same run already have the column
+    if column.name in {c["name"] for c in inspect(conn).get_columns(column.table.name)}:
+        return
+    ddl = CreateColumn(column).compile(dialect=conn.dialect)
+    if default_sql is not None:
+        ddl = f"{ddl} DEFAULT {default_sql}"
+    conn.exec_driver_sql(f'ALTER TABLE "{column.table.name}" ADD COLUMN {ddl}')
+
+def create_indexes(conn: Connection, column: Column) -> None:
+    for index in column.table.indexes:
+        if column.name in index.columns:
+            index.create(conn, checkfirst=True)
+
+def _v3_sync_columns(conn: Connection) -> None:
+    for model in (Expense, Income, Category):
+        table = model.__table__
+        add_column(conn, table.c.updated_at)
+        add_column(conn, table.c.change_seq, "0")
+        create_indexes(conn, table.c.change_seq)
+
+def _v4_money_to_cents(conn: Connection) -> None:
+    columns = [(m.__table__.c.amount_cents, "amount") for m in (Expense, Income, ExpenseArchive, IncomeArchive)]
+    columns.append((User.__table__.c.balance_cents, "balance"))
+    for column, old in columns:
+        table = column.table.name
+        if old not in {c["name"] for c in inspect(conn).get_columns(table)}:
+            continue
+        add_column(conn, column, "0")
+        conn.exec_driver_sql(f'UPDATE "{table}" SET {column.name} = CAST(ROUND({old} * 100) AS BIGINT)')
+        conn.exec_driver_sql(f'ALTER TABLE "{table}" DROP COLUMN {old}')
+
+def _rebuild_stats(conn: Connection) -> None:
+    from .anomalies import rebuild_stats
+    # the session joins init_db's transaction, so its commit leaves that transaction open
+    with Session(bind=conn) as db:
+        rebuild_stats(db)
+
+def _v5_anomaly_z(conn: Connection) -> None:
+    add_column(conn, Expense.__table__.c.anomaly_z)
+    create_indexes(conn, Expense.__table__.c.anomaly_z)
+    # existing history starts the running statistics
+    _rebuild_stats(conn)
+
+def _v8_intern_descriptions(conn: Connection) -> None:
+    for model in (Expense, Income, ExpenseArchive, IncomeArchive):
+        table = model.__tablename__
+        if "description" not in {c["name"] for c in inspect(conn).get_columns(table)}:
+            continue
+        conn.exec_driver_sql(
+            # text doubles as the key here; the v12 step recomputes keys
+            f'INSERT INTO description (text, "key") SELECT DISTINCT t.description, t.description FROM "{table}" t '
+            f'WHERE NOT EXISTS (SELECT 1 FROM description d WHERE d.text = t.description)'
+        )
+        add_column(conn, model.__table__.c.description_id, "0")
+        conn.exec_driver_sql(
+            f'UPDATE "{table}" SET description_id = '
+            f'(SELECT d.id FROM description d WHERE d.text = "{table}".description)'
+        )
+        conn.exec_driver_sql(f'ALTER TABLE "{table}" DROP COLUMN description')
+
+def _v9_per_user_sync_counters(conn: Connection) -> None:
+    # the old global counter was row 1; its value becomes the floor of every
+    # per-user and category counter, so cursors handed out before stay valid
+    last = conn.execute(select(SyncCounter.value).where(SyncCounter.id == 1)).scalar()
+    if not last:
+        return
+    existing = set(conn.execute(select(SyncCounter.id)).scalars())
+    scopes = [CATEGORY_SEQ, *conn.execute(select(User.id)).scalars()]
+    rows = [{"id": scope, "value": last} for scope in scopes if scope not in existing]
+    if rows:
+        conn.execute(insert(SyncCounter), rows)
+
+def _v10_unique_uncategorized_stats(conn: Connection) -> None:
+    duplicated = conn.execute(
+        select(SpendingStat.user_id).where(SpendingStat.category_id.is_(None))
+        .group_by(SpendingStat.user_id).having(func.count() > 1).limit(1)
+    ).first()
+    if duplicated:
+        _rebuild_stats(conn)
+    for index in SpendingStat.__table__.indexes:
+        index.create(conn, checkfirst=True)
+
+def _v11_archive_change_seq(conn: Connection) -> None:
+    for model in (ExpenseArchive, IncomeArchive):
+        add_column(conn, model.__table__.c.change_seq, "0")
+        create_indexes(conn, model.__table__.c.change_seq)
+
+def _v12_description_keys(conn: Connection) -> None:
+    from .descriptions import normalize
+    table = Description.__table__
+    add_column(conn, table.c.key, "''")
+    for index in table.indexes:
+        index.drop(conn, checkfirst=True)
+
+    # the oldest row of every key survives, with its spelling whitespace-collapsed
+    keepers, merged = {}, {}
+    for id, text in conn.execute(select(table.c.id, table.c.text).order_by(table.c.id)):
+        key = normalize(text).lower()
+        if key in keepers:
+            merged[id] = keepers[key][0]
+        else:
+            keepers[key] = (id, normalize(text))
+    if merged:
+        for model in (Expense, Income, ExpenseArchive, IncomeArchive):
+            t = model.__table__
+            conn.execute(update(t).where(t.c.description_id == bindparam("dup")).values(description_id=bindparam("keeper")),
+                         [{"dup": dup, "keeper": keeper} for dup, keeper in merged.items()])
+        conn.execute(delete(table).where(table.c.id.in_(list(merged))))
+    if keepers:
+        conn.execute(update(table).where(table.c.id == bindparam("row_id"))
+                     .values(text=bindparam("new_text"), key=bindparam("new_key")),
+                     [{"row_id": id, "new_text": text, "new_key": key} for key, (id, text) in keepers.items()])
+    for index in table.indexes:
+        index.create(conn)
+
+def _v13_user_away(conn: Connection) -> None:
+    add_column(conn, User.__table__.c.away, "false")
+
+# version -> step that brings an existing database from version - 1 to version.
+# New tables are handled by create_all; steps only alter what already exists.
+MIGRATIONS: Dict[int, Callable[[Connection], None]] = {
+    3: _v3_sync_columns,
+    4: _v4_money_to_cents,
+    5: _v5_anomaly_z,
+    8: _v8_intern_descriptions,
+    9: _v9_per_user_sync_counters,
+    10: _v10_unique_uncategorized_stats,
+    11: _v11_archive_change_seq,
+    12: _v12_description_keys,
+    13: _v13_user_away,
+}
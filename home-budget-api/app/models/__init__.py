@@ -1,5 +1,12 @@
 from .base import Base
 from .user import User
 from .category import Category
+from .description import Description
 from .expense import Expense
 from .income import Income
+from .schema_version import SchemaVersion
+from .archive import ExpenseArchive, IncomeArchive, ArchiveState
+from .sync import SyncCounter, Tombstone, CATEGORY_SEQ
+from .spending_stat import SpendingStat
+from .user_shard import UserShard
+from .idempotency import IdempotencyKey
@@ -0,0 +1,64 @@
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy import ForeignKey, DateTime, BigInteger, Index
+from datetime import datetime
+from .base import Base
+from ..money import from_cents
+
+# Cold copies of Expense/Income. On PostgreSQL they are range-partitioned by month
+# on created_at, which is why created_at is part of the primary key.
+
+class ExpenseArchive(Base):
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, primary_key=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("user.id", ondelete="CASCADE"))
+    category_id: Mapped[int] = mapped_column(ForeignKey("category.id", ondelete="SET NULL"), nullable=True)
+    description_id: Mapped[int] = mapped_column(ForeignKey("description.id"))
+    amount_cents: Mapped[int] = mapped_column(BigInteger)
+    change_seq: Mapped[int] = mapped_column(BigInteger, default=0)
+
+    category = relationship("Category", viewonly=True)
+    description_ref = relationship("Description", lazy="joined", innerjoin=True, viewonly=True)
+
+    __table_args__ = (
+        Index("ix_expense_archive_user_created", "user_id", "created_at"),
+        Index("ix_expense_archive_user_change_seq", "user_id", "change_seq"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
+
+    @property
+    def amount(self) -> float:
+        return from_cents(self.amount_cents)
+
+    @property
+    def description(self) -> str:
+        return self.description_ref.text
+
+class IncomeArchive(Base):
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), primary_key=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("user.id", ondelete="CASCADE"))
+    description_id: Mapped[int] = mapped_column(ForeignKey("description.id"))
+    amount_cents: Mapped[int] = mapped_column(BigInteger)
+    change_seq: Mapped[int] = mapped_column(BigInteger, default=0)
+
+    description_ref = relationship("Description", lazy="joined", innerjoin=True, viewonly=True)
+
+    __table_args__ = (
+        Index("ix_income_archive_user_created", "user_id", "created_at"),
+        Index("ix_income_archive_user_change_seq", "user_id", "change_seq"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
+
+    @property
+    def amount(self) -> float:
+        return from_cents(self.amount_cents)
+
+    @property
+    def description(self) -> str:
+        return self.description_ref.text
+
+class ArchiveState(Base):
+    id: Mapped[int] = mapped_column(primary_key=True)
+    # Expense/Income rows older than this may live in the archive tables
+    # (unarchived rows sit below it in the hot tables until the next run)
+    archived_before: Mapped[datetime] = mapped_column(DateTime(timezone=True))
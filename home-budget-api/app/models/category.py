@@ -1,9 +1,13 @@
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import String
+from sqlalchemy import String, DateTime, BigInteger
+from datetime import datetime, UTC
+from typing import Optional
 from .base import Base
 
 class Category(Base):
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     name: Mapped[str] = mapped_column(String(100), unique=True, index=True)
+    updated_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(UTC), onupdate=lambda: datetime.now(UTC), nullable=True)
+    change_seq: Mapped[int] = mapped_column(BigInteger, default=0, index=True)
 
     expenses = relationship("Expense", back_populates="category", cascade="all, delete-orphan")
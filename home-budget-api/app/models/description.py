@@ -0,0 +1,11 @@
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import String
+from .base import Base
+
+class Description(Base):
+    """Interned description/merchant text; expenses and incomes reference it by id."""
+    id: Mapped[int] = mapped_column(primary_key=True)
+    text: Mapped[str] = mapped_column(String(255), unique=True)
+    # whitespace-collapsed, lower-cased text; "Lidl", "lidl " and "LIDL" share one row
+    # and keep the spelling that was seen first
+    key: Mapped[str] = mapped_column(String(255), unique=True, index=True)
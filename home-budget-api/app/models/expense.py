@@ -1,15 +1,44 @@
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import ForeignKey, String, DateTime, Numeric
-from datetime import datetime
+from sqlalchemy import ForeignKey, DateTime, BigInteger, Float, Index
+from datetime import datetime, UTC
+from typing import Optional
 from .base import Base
+from ..money import from_cents
+from ..config import settings
 
 class Expense(Base):
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("user.id", ondelete="CASCADE"), index=True)
     category_id: Mapped[int] = mapped_column(ForeignKey("category.id", ondelete="SET NULL"), nullable=True, index=True)
-    description: Mapped[str] = mapped_column(String(255))
-    amount: Mapped[float] = mapped_column(Numeric(12, 2))
+    description_id: Mapped[int] = mapped_column(ForeignKey("description.id"))
+    amount_cents: Mapped[int] = mapped_column(BigInteger)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    updated_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(UTC), onupdate=lambda: datetime.now(UTC), nullable=True)
+    change_seq: Mapped[int] = mapped_column(BigInteger, default=0)
+    # z-score of the amount against the user's history in this category at write time
+    anomaly_z: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
 
     user = relationship("User", back_populates="expenses")
     category = relationship("Category", back_populates="expenses")
+    description_ref = relationship("Description", lazy="joined", innerjoin=True)
+
+    __table_args__ = (
+        Index("ix_expense_user_change_seq", "user_id", "change_seq"),
+        Index("ix_expense_user_anomaly_z", "user_id", "anomaly_z"),
+        # ids are never reused (archived rows keep theirs) and start at the shard's id floor
+        {"sqlite_autoincrement": True},
+    )
+
+    @property
+    def amount(self) -> float:
+        return from_cents(self.amount_cents)
+
+    @property
+    def description(self) -> str:
+        return self.description_ref.text
+
+    @property
+    def is_anomaly(self) -> Optional[bool]:
+        if self.anomaly_z is None:
+            return None
+        return abs(self.anomaly_z) >= settings.ANOMALY_Z_THRESHOLD
@@ -1,11 +1,31 @@
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import String, DateTime, Numeric, ForeignKey
+from sqlalchemy import DateTime, ForeignKey, BigInteger, Index
 from datetime import datetime, UTC
+from typing import Optional
 from .base import Base
+from ..money import from_cents
 
 class Income(Base):
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("user.id", ondelete="CASCADE"), index=True)
-    description: Mapped[str] = mapped_column(String(255))
-    amount: Mapped[float] = mapped_column(Numeric(12, 2))
+    description_id: Mapped[int] = mapped_column(ForeignKey("description.id"))
+    amount_cents: Mapped[int] = mapped_column(BigInteger)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(UTC))
+    updated_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(UTC), onupdate=lambda: datetime.now(UTC), nullable=True)
+    change_seq: Mapped[int] = mapped_column(BigInteger, default=0)
+
+    description_ref = relationship("Description", lazy="joined", innerjoin=True)
+
+    __table_args__ = (
+        Index("ix_income_user_change_seq", "user_id", "change_seq"),
+        # ids are never reused (archived rows keep theirs) and start at the shard's id floor
+        {"sqlite_autoincrement": True},
+    )
+
+    @property
+    def amount(self) -> float:
+        return from_cents(self.amount_cents)
+
+    @property
+    def description(self) -> str:
+        return self.description_ref.text
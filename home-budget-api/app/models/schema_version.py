@@ -0,0 +1,5 @@
+from sqlalchemy.orm import Mapped, mapped_column
+from .base import Base
+
+class SchemaVersion(Base):
+    version: Mapped[int] = mapped_column(primary_key=True)
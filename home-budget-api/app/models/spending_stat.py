@@ -0,0 +1,20 @@
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import ForeignKey, Float, Index, UniqueConstraint, text
+from typing import Optional
+from .base import Base
+
+class SpendingStat(Base):
+    """Running count/mean/M2 (Welford) of expense amounts in cents per user and category."""
+    id: Mapped[int] = mapped_column(primary_key=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("user.id", ondelete="CASCADE"))
+    category_id: Mapped[Optional[int]] = mapped_column(ForeignKey("category.id", ondelete="CASCADE"), nullable=True)
+    count: Mapped[int] = mapped_column(default=0)
+    mean: Mapped[float] = mapped_column(Float, default=0.0)
+    m2: Mapped[float] = mapped_column(Float, default=0.0)
+
+    # NULLs never collide in a unique constraint, so uncategorized rows need their own index
+    __table_args__ = (
+        UniqueConstraint("user_id", "category_id"),
+        Index("uq_spending_stat_uncategorized", "user_id", unique=True,
+              sqlite_where=text("category_id IS NULL"), postgresql_where=text("category_id IS NULL")),
+    )
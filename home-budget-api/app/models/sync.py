@@ -0,0 +1,76 @@
+from sqlalchemy.orm import Mapped, mapped_column, Session
+from sqlalchemy import String, DateTime, BigInteger, Index, event, update, insert
+from datetime import datetime, UTC
+from typing import Optional
+from .base import Base
+from .category import Category
+from .expense import Expense
+from .income import Income
+
+SYNCED = {Expense: "expense", Income: "income", Category: "category"}
+
+# Change sequences are per user, so concurrent writers only contend on their own
+# counter row. Categories are shared by everyone and use the CATEGORY_SEQ row.
+CATEGORY_SEQ = 0
+
+class SyncCounter(Base):
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)  # user id, or CATEGORY_SEQ
+    value: Mapped[int] = mapped_column(BigInteger, default=0)
+
+class Tombstone(Base):
+    id: Mapped[int] = mapped_column(primary_key=True)
+    entity: Mapped[str] = mapped_column(String(20))
+    entity_id: Mapped[int] = mapped_column()
+    user_id: Mapped[Optional[int]] = mapped_column(nullable=True)
+    change_seq: Mapped[int] = mapped_column(BigInteger)
+    deleted_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(UTC))
+
+    __table_args__ = (
+        Index("ix_tombstone_user_change_seq", "user_id", "change_seq"),
+        Index("ix_tombstone_change_seq", "change_seq"),
+    )
+
+def reserve_change_seqs(session: Session, scope: int, n: int) -> int:
+    """Bump the counter of scope (a user id or CATEGORY_SEQ) by n and return the last reserved value.
+
+    The UPDATE holds that counter row lock until commit, so within one scope
+    sequence numbers become visible in commit order and a cursor never skips a change.
+    """
+    conn = session.connection()
+    last = conn.execute(
+        update(SyncCounter).where(SyncCounter.id == scope).values(value=SyncCounter.value + n).returning(SyncCounter.value)
+    ).scalar()
+    if last is None:
+        conn.execute(insert(SyncCounter).values(id=scope, value=n))
+        last = n
+    return last
+
+def current_seq(session: Session, scope: int) -> int:
+    return session.query(SyncCounter.value).filter(SyncCounter.id == scope).scalar() or 0
+
+def _scope(obj) -> int:
+    return CATEGORY_SEQ if isinstance(obj, Category) else obj.user_id
+
+@event.listens_for(Session, "before_flush")
+def _stamp_change_seq(session, flush_context, instances):
+    changed = [o for o in list(session.new) + list(session.dirty)
+               if type(o) in SYNCED and (o in session.new or session.is_modified(o, include_collections=False))]
+    deleted = [o for o in session.deleted if type(o) in SYNCED]
+    if not changed and not deleted:
+        return
+
+    gone = set(deleted)
+    scopes = {}
+    for obj in changed + deleted:
+        scopes.setdefault(_scope(obj), []).append(obj)
+    # fixed lock order across scopes, so two multi-user flushes cannot deadlock
+    for scope in sorted(scopes):
+        objs = scopes[scope]
+        seq = reserve_change_seqs(session, scope, len(objs)) - len(objs)
+        for obj in objs:
+            seq += 1
+            if obj in gone:
+                session.add(Tombstone(entity=SYNCED[type(obj)], entity_id=obj.id,
+                                      user_id=getattr(obj, "user_id", None), change_seq=seq))
+            else:
+                obj.change_seq = seq
@@ -1,11 +1,21 @@
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import String, Float
+from sqlalchemy import String, BigInteger, Boolean
 from .base import Base
+from ..money import from_cents
 
 class User(Base):
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     email: Mapped[str] = mapped_column(String(255), unique=True, index=True)
     hashed_password: Mapped[str] = mapped_column(String(255))
-    balance: Mapped[float] = mapped_column(Float, default=0.0)
+    # authoritative only on the user's shard; the directory's auth-only copy of a
+    # user living on another database holds 0 (see sharding.place_user)
+    balance_cents: Mapped[int] = mapped_column(BigInteger, default=0)
+    # set on a shard's copy once the user's data has moved to another shard (or is
+    # being moved); requests routed here by a stale placement cache get a 503
+    away: Mapped[bool] = mapped_column(Boolean, default=False)
 
-    expenses = relationship("Expense", back_populates="user", cascade="all, delete-orphan")
\ No newline at end of file
+    expenses = relationship("Expense", back_populates="user", cascade="all, delete-orphan")
+
+    @property
+    def balance(self) -> float:
+        return from_cents(self.balance_cents)
@@ -0,0 +1,7 @@
+from sqlalchemy.orm import Mapped, mapped_column
+from .base import Base
+
+class UserShard(Base):
+    # lives in the directory database: which shard holds the user's data
+    user_id: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+    shard: Mapped[int] = mapped_column()
@@ -0,0 +1,9 @@
+from decimal import Decimal, ROUND_HALF_UP
+
+# Money is stored as integer minor units (cents); the API speaks decimal amounts.
+
+def to_cents(amount) -> int:
+    return int((Decimal(str(amount)) * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+def from_cents(cents) -> float:
+    return int(cents or 0) / 100
@@ -0,0 +1,63 @@
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+# Shared by the analytics router and the statements job, which must not import the web app.
+
+def _start_of_month(dt: datetime) -> datetime:
+    return dt.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+def _end_of_month(dt: datetime) -> datetime:
+    first_next = (dt.replace(day=1) + timedelta(days=32)).replace(day=1)
+    return first_next.replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(microseconds=1)
+
+def _quarter_bounds(dt: datetime) -> (datetime, datetime):
+    q = (dt.month - 1) // 3 + 1
+    start_month = 3 * (q - 1) + 1
+    start = dt.replace(month=start_month, day=1, hour=0, minute=0, second=0, microsecond=0)
+    end_month_first = (start.replace(day=1) + timedelta(days=92)).replace(day=1)  # enough to jump next quarter
+    end = end_month_first - timedelta(microseconds=1)
+    return start, end
+
+def period_range(period: Optional[str], date_from: Optional[datetime], date_to: Optional[datetime]) -> (datetime, datetime, str):
+    """(start, end, name) of a named period or a custom range; ValueError when the input is invalid."""
+    if date_from and date_to:
+        if date_to.hour == 0 and date_to.minute == 0 and date_to.second == 0 and date_to.microsecond == 0:
+            date_to = date_to.replace(hour=23, minute=59, second=59, microsecond=999999)
+        return date_from, date_to, "custom"
+
+    if (date_from and not date_to) or (date_to and not date_from):
+        raise ValueError("Provide both date_from and date_to, or use 'period'")
+
+    now = datetime.now(timezone.utc)
+    today = now.astimezone(timezone.utc)
+
+    p = (period or "last_month").lower()
+
+    if p == "this_month":
+        start = _start_of_month(today)
+        end = _end_of_month(today)
+        return start, end, p
+    elif p == "last_month":
+        first_this = _start_of_month(today)
+        last_month_end = first_this - timedelta(microseconds=1)
+        start = _start_of_month(last_month_end)
+        end = _end_of_month(last_month_end)
+        return start, end, p
+    elif p == "this_quarter":
+        start, end = _quarter_bounds(today)
+        return start, end, p
+    elif p == "last_quarter":
+        start_this, _ = _quarter_bounds(today)
+        last_q_end = start_this - timedelta(microseconds=1)
+        start, end = _quarter_bounds(last_q_end)
+        return start, end, p
+    elif p == "this_year":
+        start = today.replace(month=1, day=1, hour=0, minute=0, second=0, microsecond=0)
+        end = today.replace(month=12, day=31, hour=23, minute=59, second=59, microsecond=999999)
+        return start, end, p
+    elif p == "last_year":
+        start = today.replace(year=today.year - 1, month=1, day=1, hour=0, minute=0, second=0, microsecond=0)
+        end = today.replace(year=today.year - 1, month=12, day=31, hour=23, minute=59, second=59, microsecond=999999)
+        return start, end, p
+    else:
+        raise ValueError("Invalid 'period'. Use one of: this_month, last_month, this_quarter, last_quarter, this_year, last_year, or provide date_from & date_to")
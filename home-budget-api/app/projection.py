@@ -0,0 +1,94 @@
+from operator import itemgetter
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import null
+from sqlalchemy.orm import Query
+
+from .archive import newest_first
+from .config import settings
+from .models import Category, Description
+from .money import from_cents
+
+# `fields=` support for the list endpoints: only the columns behind the requested
+# fields are SELECTed, and rows are serialized straight to dicts.
+
+class Field(NamedTuple):
+    columns: Tuple[str, ...]
+    value: Callable[[Any], Any]
+
+def _plain(name: str) -> Field:
+    return Field((name,), lambda row: getattr(row, name))
+
+def _category(row) -> Optional[dict]:
+    if row.category_ref_id is None:
+        return None
+    return {"name": row.category_ref_name, "id": row.category_ref_id}
+
+def _is_anomaly(row) -> Optional[bool]:
+    return None if row.anomaly_z is None else abs(row.anomaly_z) >= settings.ANOMALY_Z_THRESHOLD
+
+COMMON_FIELDS: Dict[str, Field] = {
+    "id": _plain("id"),
+    "description": Field(("description_text",), lambda row: row.description_text),
+    "amount": Field(("amount_cents",), lambda row: from_cents(row.amount_cents)),
+    "created_at": _plain("created_at"),
+    "updated_at": _plain("updated_at"),
+}
+
+EXPENSE_FIELDS: Dict[str, Field] = {
+    **COMMON_FIELDS,
+    "category_id": _plain("category_id"),
+    "category": Field(("category_ref_id", "category_ref_name"), _category),
+    "anomaly_z": _plain("anomaly_z"),
+    "is_anomaly": Field(("anomaly_z",), _is_anomaly),
+}
+
+INCOME_FIELDS: Dict[str, Field] = dict(COMMON_FIELDS)
+
+def parse_fields(fields: Optional[str], available: Dict[str, Field]) -> Optional[List[str]]:
+    if not fields:
+        return None
+    names = list(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+    unknown = [n for n in names if n not in available]
+    if unknown or not names:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields: {', '.join(unknown)}. Allowed: {', '.join(available)}",
+        )
+    return names
+
+def project(query: Query, model, names: List[str], available: Dict[str, Field]) -> List[dict]:
+    columns = list(dict.fromkeys(c for n in names for c in available[n].columns))
+    selected = []
+    for col in columns:
+        if col == "category_ref_id":
+            query = query.outerjoin(Category, model.category_id == Category.id)
+            selected.append(Category.id.label(col))
+        elif col == "category_ref_name":
+            selected.append(Category.name.label(col))
+        elif col == "description_text":
+            query = query.join(Description, model.description_id == Description.id)
+            selected.append(Description.text.label(col))
+        elif hasattr(model, col):
+            selected.append(getattr(model, col).label(col))
+        else:
+            # archive tables do not carry every hot column
+            selected.append(null().label(col))
+    rows = query.with_entities(*selected).all()
+    return [{n: available[n].value(row) for n in names} for row in rows]
+
+def project_newest_first(hot: Query, hot_model, cold: Query, cold_model, names: List[str],
+                         available: Dict[str, Field]) -> List[dict]:
+    """project() over a hot and an archive query, merged on created_at."""
+    keyed = names if "created_at" in names else names + ["created_at"]
+    items = newest_first(project(hot, hot_model, keyed, available), project(cold, cold_model, keyed, available),
+                         itemgetter("created_at"))
+    if keyed is not names:
+        for item in items:
+            del item["created_at"]
+    return items
+
+def projected_response(items: List[dict]) -> JSONResponse:
+    return JSONResponse(jsonable_encoder(items))
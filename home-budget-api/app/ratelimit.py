@@ -0,0 +1,151 @@
+import math
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional, Protocol, Tuple
+
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse
+
+from .config import settings
+from .auth.deps import scope_subject
+
+def _refill_and_take(tokens: float, updated: float, now: float, cost: float,
+                     capacity: float, rate: float) -> Tuple[bool, float, float]:
+    tokens = min(capacity, tokens + max(0.0, now - updated) * rate)
+    if tokens >= cost:
+        return True, tokens - cost, 0.0
+    return False, tokens, (cost - tokens) / rate
+
+class Backend(Protocol):
+    def take(self, key: str, cost: float, capacity: float, rate: float, now: float) -> Tuple[bool, float]: ...
+    def reset(self) -> None: ...
+
+class MemoryBackend:
+    def __init__(self):
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def take(self, key, cost, capacity, rate, now):
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (capacity, now))
+            allowed, tokens, retry_after = _refill_and_take(tokens, updated, now, cost, capacity, rate)
+            self._buckets[key] = (tokens, now)
+        return allowed, retry_after
+
+    def reset(self):
+        with self._lock:
+            self._buckets.clear()
+
+class SQLiteBackend:
+    """Buckets in a local SQLite file, shared by every worker process on the host."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("CREATE TABLE IF NOT EXISTS bucket (key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    def take(self, key, cost, capacity, rate, now):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tokens, updated FROM bucket WHERE key = ?", (key,)).fetchone()
+            tokens, updated = row or (capacity, now)
+            allowed, tokens, retry_after = _refill_and_take(tokens, updated, now, cost, capacity, rate)
+            conn.execute(
+                "INSERT INTO bucket (key, tokens, updated) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated",
+                (key, tokens, now),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return allowed, retry_after
+
+    def reset(self):
+        self._conn().execute("DELETE FROM bucket")
+
+class RateLimiter:
+    def __init__(self, backend: Backend, capacity: float, refill_per_second: float,
+                 costs: Optional[Dict[str, float]] = None, enabled: bool = True):
+        self.backend = backend
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.costs = costs or {}
+        self.enabled = enabled
+
+    @classmethod
+    def from_settings(cls) -> "RateLimiter":
+        if settings.RATE_LIMIT_BACKEND == "sqlite":
+            backend = SQLiteBackend(settings.RATE_LIMIT_SQLITE_PATH)
+        elif settings.RATE_LIMIT_BACKEND == "memory":
+            backend = MemoryBackend()
+        else:
+            raise ValueError(f"Unknown RATE_LIMIT_BACKEND: {settings.RATE_LIMIT_BACKEND!r}")
+        return cls(backend, settings.RATE_LIMIT_CAPACITY, settings.RATE_LIMIT_REFILL_PER_SECOND,
+                   settings.RATE_LIMIT_COSTS, settings.RATE_LIMIT_ENABLED)
+
+    def cost_for(self, path: str) -> float:
+        best, cost = -1, 1.0
+        for prefix, prefix_cost in self.costs.items():
+            if path.startswith(prefix) and len(prefix) > best:
+                best, cost = len(prefix), prefix_cost
+        return min(cost, self.capacity)
+
+    def hit(self, key: str, path: str) -> Tuple[bool, float]:
+        return self.backend.take(key, self.cost_for(path), self.capacity, self.refill_per_second, time.time())
+
+_limiter: Optional[RateLimiter] = None
+_limiter_lock = threading.Lock()
+
+def get_limiter() -> RateLimiter:
+    """The process-wide limiter, built on first use so importing the app creates no bucket file."""
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = RateLimiter.from_settings()
+        return _limiter
+
+class RateLimitMiddleware:
+    """Token bucket per JWT subject (per client IP for anonymous calls); 429 + Retry-After when empty."""
+
+    def __init__(self, app, limiter: Optional[RateLimiter] = None):
+        self.app = app
+        self._limiter = limiter
+
+    @property
+    def limiter(self) -> RateLimiter:
+        return self._limiter or get_limiter()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.limiter.enabled:
+            return await self.app(scope, receive, send)
+
+        sub = scope_subject(scope)
+        key = f"user:{sub}" if sub else None
+        if key is None:
+            client = scope.get("client")
+            key = f"ip:{client[0] if client else 'unknown'}"
+
+        if isinstance(self.limiter.backend, MemoryBackend):
+            allowed, retry_after = self.limiter.hit(key, scope["path"])
+        else:
+            # BEGIN IMMEDIATE can wait up to the 5 s busy timeout; keep it off the event loop
+            allowed, retry_after = await run_in_threadpool(self.limiter.hit, key, scope["path"])
+        if not allowed:
+            response = JSONResponse(
+                {"detail": "Too many requests"}, status_code=429,
+                headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+            )
+            return await response(scope, receive, send)
+        return await self.app(scope, receive, send)
@@ -1,72 +1,24 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import func, case
-from datetime import datetime, timedelta, timezone
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import func, case, or_
+from datetime import datetime
 from typing import Optional, List, Dict, Any
 from ..auth.deps import get_db, get_current_user
-from ..models import Expense, Category, User, Income
+from ..models import Expense, Category, User, Income, Description
+from ..archive import archive_horizon, reaches_archive, source
+from ..money import from_cents
+from ..config import settings
+from ..periods import period_range
+from ..schemas.expense import ExpenseOut
 
 router = APIRouter(prefix="/analytics", tags=["analytics"])
 
 
-def _start_of_month(dt: datetime) -> datetime:
-    return dt.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-
-def _end_of_month(dt: datetime) -> datetime:
-    first_next = (dt.replace(day=1) + timedelta(days=32)).replace(day=1)
-    return first_next.replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(microseconds=1)
-
-def _quarter_bounds(dt: datetime) -> (datetime, datetime):
-    q = (dt.month - 1) // 3 + 1
-    start_month = 3 * (q - 1) + 1
-    start = dt.replace(month=start_month, day=1, hour=0, minute=0, second=0, microsecond=0)
-    end_month_first = (start.replace(day=1) + timedelta(days=92)).replace(day=1)  # enough to jump next quarter
-    end = end_month_first - timedelta(microseconds=1)
-    return start, end
-
 def _period_range(period: Optional[str], date_from: Optional[datetime], date_to: Optional[datetime]) -> (datetime, datetime, str):
-    if date_from and date_to:
-        if date_to.hour == 0 and date_to.minute == 0 and date_to.second == 0 and date_to.microsecond == 0:
-            date_to = date_to.replace(hour=23, minute=59, second=59, microsecond=999999)
-        return date_from, date_to, "custom"
-
-    if (date_from and not date_to) or (date_to and not date_from):
-        raise HTTPException(status_code=400, detail="Provide both date_from and date_to, or use 'period'")
-
-    now = datetime.now(timezone.utc)
-    today = now.astimezone(timezone.utc)
-
-    p = (period or "last_month").lower()
-
-    if p == "this_month":
-        start = _start_of_month(today)
-        end = _end_of_month(today)
-        return start, end, p
-    elif p == "last_month":
-        first_this = _start_of_month(today)
-        last_month_end = first_this - timedelta(microseconds=1)
-        start = _start_of_month(last_month_end)
-        end = _end_of_month(last_month_end)
-        return start, end, p
-    elif p == "this_quarter":
-        start, end = _quarter_bounds(today)
-        return start, end, p
-    elif p == "last_quarter":
-        start_this, _ = _quarter_bounds(today)
-        last_q_end = start_this - timedelta(microseconds=1)
-        start, end = _quarter_bounds(last_q_end)
-        return start, end, p
-    elif p == "this_year":
-        start = today.replace(month=1, day=1, hour=0, minute=0, second=0, microsecond=0)
-        end = today.replace(month=12, day=31, hour=23, minute=59, second=59, microsecond=999999)
-        return start, end, p
-    elif p == "last_year":
-        start = today.replace(year=today.year - 1, month=1, day=1, hour=0, minute=0, second=0, microsecond=0)
-        end = today.replace(year=today.year - 1, month=12, day=31, hour=23, minute=59, second=59, microsecond=999999)
-        return start, end, p
-    else:
-        raise HTTPException(status_code=400, detail="Invalid 'period'. Use one of: this_month, last_month, this_quarter, last_quarter, this_year, last_year, or provide date_from & date_to")
-
+    try:
+        return period_range(period, date_from, date_to)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
 
 @router.get("/summary")
 def analytics_summary(
@@ -78,53 +30,65 @@ def analytics_summary(
 ) -> Dict[str, Any]:
     start, end, period_name = _period_range(period, date_from, date_to)
 
-    q = db.query(Expense).filter(Expense.user_id == user.id, Expense.created_at >= start, Expense.created_at <= end)
+    # archived rows are only read when the period (or the lifetime totals) reach past the horizon
+    horizon = archive_horizon(db)
+    exp_src = source(Expense, reaches_archive(horizon, start))
+    exp, exp_all = exp_src.c, source(Expense, horizon is not None).c
+    inc, inc_all = source(Income, reaches_archive(horizon, start)).c, source(Income, horizon is not None).c
 
-    spent_total = db.query(func.coalesce(func.sum(Expense.amount), 0.0))\
-        .filter(Expense.user_id == user.id, Expense.created_at >= start, Expense.created_at <= end)\
-        .scalar() or 0.0
+    spent_total = db.query(func.coalesce(func.sum(exp.amount_cents), 0))\
+        .filter(exp.user_id == user.id, exp.created_at >= start, exp.created_at <= end)\
+        .scalar() or 0
 
-    count_total = db.query(func.count(Expense.id))\
-        .filter(Expense.user_id == user.id, Expense.created_at >= start, Expense.created_at <= end)\
+    count_total = db.query(func.count(exp.id))\
+        .filter(exp.user_id == user.id, exp.created_at >= start, exp.created_at <= end)\
         .scalar() or 0
 
     cat_label = func.coalesce(Category.name, 'uncategorized')
     by_cat_rows = (
-        db.query(cat_label.label("category"), func.coalesce(func.sum(Expense.amount), 0.0).label("total"))
-        .outerjoin(Category, Expense.category_id == Category.id)
-        .filter(Expense.user_id == user.id, Expense.created_at >= start, Expense.created_at <= end)
+        db.query(cat_label.label("category"), func.coalesce(func.sum(exp.amount_cents), 0).label("total"))
+        .select_from(exp_src)
+        .outerjoin(Category, exp.category_id == Category.id)
+        .filter(exp.user_id == user.id, exp.created_at >= start, exp.created_at <= end)
         .group_by(cat_label)
-        .order_by(func.sum(Expense.amount).desc())
+        .order_by(func.sum(exp.amount_cents).desc())
         .all()
     )
-    by_category = [{"category": r.category, "total": float(r.total)} for r in by_cat_rows]
+    by_category = [{"category": r.category, "total": from_cents(r.total)} for r in by_cat_rows]
 
-    lifetime_spent = db.query(func.coalesce(func.sum(Expense.amount), 0.0))\
-        .filter(Expense.user_id == user.id)\
-        .scalar() or 0.0
+    lifetime_spent = db.query(func.coalesce(func.sum(exp_all.amount_cents), 0))\
+        .filter(exp_all.user_id == user.id)\
+        .scalar() or 0
     
+    # grouped on the interned id; the text is joined in for the few result rows only
+    by_source_totals = (
+    db.query(inc.description_id.label("description_id"),
+             func.coalesce(func.sum(inc.amount_cents), 0).label("total"))
+    .filter(inc.user_id == user.id,
+            inc.created_at >= start,
+            inc.created_at <= end)
+    .group_by(inc.description_id)
+    .subquery()
+    )
     by_source_rows = (
-    db.query(Income.description.label("source"),
-             func.coalesce(func.sum(Income.amount), 0.0).label("total"))
-    .filter(Income.user_id == user.id,
-            Income.created_at >= start,
-            Income.created_at <= end)
-    .group_by(Income.description)
-    .order_by(func.sum(Income.amount).desc())
+    db.query(Description.text.label("source"), by_source_totals.c.total)
+    .join(by_source_totals, Description.id == by_source_totals.c.description_id)
+    .order_by(by_source_totals.c.total.desc())
     .all()
     )
-    by_source = [{"source": r.source, "total": float(r.total)} for r in by_source_rows]
+    by_source = [{"source": r.source, "total": from_cents(r.total)} for r in by_source_rows]
 
-    earned_total = db.query(func.coalesce(func.sum(Income.amount), 0.0))\
-        .filter(Income.user_id == user.id, Income.created_at >= start, Income.created_at <= end)\
-        .scalar() or 0.0
+    earned_total = db.query(func.coalesce(func.sum(inc.amount_cents), 0))\
+        .filter(inc.user_id == user.id, inc.created_at >= start, inc.created_at <= end)\
+        .scalar() or 0
 
-    lifetime_earned = db.query(func.coalesce(func.sum(Income.amount), 0.0))\
-        .filter(Income.user_id == user.id)\
-        .scalar() or 0.0
+    lifetime_earned = db.query(func.coalesce(func.sum(inc_all.amount_cents), 0))\
+        .filter(inc_all.user_id == user.id)\
+        .scalar() or 0
 
-    net_total = float(earned_total) - float(spent_total)
-    initial_estimate = float(user.balance or 0.0) + float(lifetime_spent) - float(lifetime_earned)
+    # everything above is integer cents; convert once at the edge
+    net_total = earned_total - spent_total
+    initial_estimate = (user.balance_cents or 0) + lifetime_spent - lifetime_earned
 
     
     return {
@@ -134,17 +98,68 @@ def analytics_summary(
             "to": end.isoformat()
         },
         "totals": {
-            "earned": float(earned_total),
-            "spent": float(spent_total),
-            "net": float(net_total),
+            "earned": from_cents(earned_total),
+            "spent": from_cents(spent_total),
+            "net": from_cents(net_total),
             "count_expenses": int(count_total),
         },
         "by_category": by_category,   
         "by_source": by_source,       
         "account": {
-            "current_balance": float(user.balance or 0.0),
-            "initial_estimate": float(initial_estimate),
-            "lifetime_spent": float(lifetime_spent),
-            "lifetime_earned": float(lifetime_earned),
+            "current_balance": from_cents(user.balance_cents),
+            "initial_estimate": from_cents(initial_estimate),
+            "lifetime_spent": from_cents(lifetime_spent),
+            "lifetime_earned": from_cents(lifetime_earned),
         },
     }
+
+@router.get("/anomalies", response_model=List[ExpenseOut])
+def analytics_anomalies(
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user),
+    limit: int = Query(20, ge=1, le=200),
+    z_threshold: Optional[float] = Query(None, gt=0, description="default iz ANOMALY_Z_THRESHOLD"),
+) -> List[Expense]:
+    # z-scores are stored at write time, so this is an index range scan, not a history scan
+    z = z_threshold or settings.ANOMALY_Z_THRESHOLD
+    return (
+        db.query(Expense)
+        .options(selectinload(Expense.category))
+        .filter(Expense.user_id == user.id, or_(Expense.anomaly_z >= z, Expense.anomaly_z <= -z))
+        .order_by(Expense.created_at.desc())
+        .limit(limit)
+        .all()
+    )
+
+@router.get("/top-merchants")
+def analytics_top_merchants(
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user),
+    period: Optional[str] = Query(None, description="this_month | last_month | this_quarter | last_quarter | this_year | last_year"),
+    date_from: Optional[datetime] = Query(None),
+    date_to: Optional[datetime] = Query(None),
+    limit: int = Query(10, ge=1, le=100),
+) -> Dict[str, Any]:
+    start, end, period_name = _period_range(period, date_from, date_to)
+    exp = source(Expense, reaches_archive(archive_horizon(db), start)).c
+
+    totals = (
+        db.query(exp.description_id.label("description_id"),
+                 func.count().label("count"),
+                 func.sum(exp.amount_cents).label("total"))
+        .filter(exp.user_id == user.id, exp.created_at >= start, exp.created_at <= end)
+        .group_by(exp.description_id)
+        .order_by(func.sum(exp.amount_cents).desc())
+        .limit(limit)
+        .subquery()
+    )
+    rows = (
+        db.query(Description.text, totals.c.count, totals.c.total)
+        .join(totals, Description.id == totals.c.description_id)
+        .order_by(totals.c.total.desc())
+        .all()
+    )
+    return {
+        "period": {"name": period_name, "from": start.isoformat(), "to": end.isoformat()},
+        "merchants": [{"merchant": r.text, "count": int(r.count), "total": from_cents(r.total)} for r in rows],
+    }
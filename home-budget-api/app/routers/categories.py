@@ -3,13 +3,15 @@ from sqlalchemy.orm import Session
 from typing import List
 from ..models import Category
 from ..schemas.category import CategoryCreate, CategoryOut
-from ..auth.deps import get_db, get_current_user
-from ..models import User
+from ..auth.deps import get_db, get_directory_db, get_current_user
+from .. import sharding
+from ..models import User, SpendingStat
 
+# Categories are global: written to the directory, replicated to every shard, read locally.
 router = APIRouter(prefix="/categories", tags=["categories"])
 
 @router.post("", response_model=CategoryOut, status_code=status.HTTP_201_CREATED)
-def create_category(payload: CategoryCreate, db: Session = Depends(get_db), user: User = Depends(get_current_user)):
+def create_category(payload: CategoryCreate, db: Session = Depends(get_directory_db), user: User = Depends(get_current_user)):
     exists = db.query(Category).filter(Category.name == payload.name).first()
     if exists:
         raise HTTPException(status_code=400, detail="Category already exists")
@@ -17,6 +19,7 @@ def create_category(payload: CategoryCreate, db: Session = Depends(get_db), user
     db.add(cat)
     db.commit()
     db.refresh(cat)
+    sharding.sync_categories(sharding.shard_map)
     return cat
 
 @router.get("", response_model=List[CategoryOut])
@@ -31,20 +34,24 @@ def get_category(category_id: int, db: Session = Depends(get_db), user: User = D
     return cat
 
 @router.put("/{category_id}", response_model=CategoryOut)
-def update_category(category_id: int, payload: CategoryCreate, db: Session = Depends(get_db), user: User = Depends(get_current_user)):
+def update_category(category_id: int, payload: CategoryCreate, db: Session = Depends(get_directory_db), user: User = Depends(get_current_user)):
     cat = db.get(Category, category_id)
     if not cat:
         raise HTTPException(status_code=404, detail="Category not found")
     cat.name = payload.name
     db.commit()
     db.refresh(cat)
+    sharding.sync_categories(sharding.shard_map)
     return cat
 
 @router.delete("/{category_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_category(category_id: int, db: Session = Depends(get_db), user: User = Depends(get_current_user)):
+def delete_category(category_id: int, db: Session = Depends(get_directory_db), user: User = Depends(get_current_user)):
     cat = db.get(Category, category_id)
     if not cat:
         raise HTTPException(status_code=404, detail="Category not found")
+    # the category's expenses go with it (cascade), and so do their statistics
+    db.query(SpendingStat).filter(SpendingStat.category_id == category_id).delete()
     db.delete(cat)
     db.commit()
+    sharding.sync_categories(sharding.shard_map)
     return
\ No newline at end of file
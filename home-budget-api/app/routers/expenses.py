@@ -3,34 +3,51 @@ from sqlalchemy.orm import Session
 from sqlalchemy import and_
 from typing import List, Optional
 from datetime import datetime, UTC
-from ..models import Expense, Category, User
+from ..models import Expense, ExpenseArchive, Category, User
 from ..schemas.expense import ExpenseCreate, ExpenseOut
 from ..auth.deps import get_db, get_current_user
+from ..archive import needs_archive, find_archived, unarchive, newest_first
+from ..money import to_cents
+from ..projection import EXPENSE_FIELDS, parse_fields, project, project_newest_first, projected_response
+from ..anomalies import record_expense, forget_expense
+from ..idempotency import Idempotency, idempotency
+from ..descriptions import describe
 
 router = APIRouter(prefix="/expenses", tags=["expenses"])
 
 @router.post("", response_model=ExpenseOut, status_code=status.HTTP_201_CREATED)
-def create_expense(payload: ExpenseCreate, db: Session = Depends(get_db), user: User = Depends(get_current_user)):
+def create_expense(
+    payload: ExpenseCreate,
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user),
+    idem: Idempotency = Depends(idempotency),
+):
+    if (replayed := idem.replay()) is not None:
+        return replayed
+
     category = None
     if payload.category_id is not None:
         category = db.get(Category, payload.category_id)
         if not category:
             raise HTTPException(status_code=400, detail="Invalid category_id")
 
-    if payload.amount <= 0:
+    # checked after rounding: 0.004 would otherwise pass and store a 0-cent row
+    amount_cents = to_cents(payload.amount)
+    if amount_cents <= 0:
         raise HTTPException(status_code=400, detail="Amount must be positive")
-
-    user.balance = (user.balance or 0) - float(payload.amount)
+    user.balance_cents = (user.balance_cents or 0) - amount_cents
 
     expense = Expense(
         user_id=user.id,
         category_id=payload.category_id,
-        description=payload.description,
-        amount=float(payload.amount),
+        description_ref=describe(db, payload.description),
+        amount_cents=amount_cents,
         created_at=datetime.now(UTC),
     )
+    record_expense(db, expense)
     db.add(expense)
-    db.commit()
+    if (stored := idem.commit(status.HTTP_201_CREATED, lambda: ExpenseOut.model_validate(expense))) is not None:
+        return stored
     db.refresh(expense)
     expense.category = category
     return expense
@@ -44,29 +61,45 @@ def list_expenses(
     amount_max: Optional[float] = None,
     date_from: Optional[datetime] = Query(None, description="ISO format, npr. 2025-01-31T00:00:00"),
     date_to: Optional[datetime] = Query(None, description="ISO format, npr. 2025-02-28T23:59:59"),
+    fields: Optional[str] = Query(None, description="samo ova polja, npr. amount,created_at"),
 ):
-    q = db.query(Expense).filter(Expense.user_id == user.id)
-
-    if category_id is not None:
-        q = q.filter(Expense.category_id == category_id)
-    if amount_min is not None:
-        q = q.filter(Expense.amount >= amount_min)
-    if amount_max is not None:
-        q = q.filter(Expense.amount <= amount_max)
-    if date_from is not None:
-        q = q.filter(Expense.created_at >= date_from)
-    if date_to is not None:
-        q = q.filter(Expense.created_at <= date_to)
-
-    items = q.order_by(Expense.created_at.desc()).all()
+    names = parse_fields(fields, EXPENSE_FIELDS)
+
+    def filtered(model):
+        q = db.query(model).filter(model.user_id == user.id)
+        if category_id is not None:
+            q = q.filter(model.category_id == category_id)
+        if amount_min is not None:
+            q = q.filter(model.amount_cents >= to_cents(amount_min))
+        if amount_max is not None:
+            q = q.filter(model.amount_cents <= to_cents(amount_max))
+        if date_from is not None:
+            q = q.filter(model.created_at >= date_from)
+        if date_to is not None:
+            q = q.filter(model.created_at <= date_to)
+        return q.order_by(model.created_at.desc())
+
+    if names is not None:
+        if needs_archive(db, date_from):
+            items = project_newest_first(filtered(Expense), Expense, filtered(ExpenseArchive), ExpenseArchive,
+                                         names, EXPENSE_FIELDS)
+        else:
+            items = project(filtered(Expense), Expense, names, EXPENSE_FIELDS)
+        return projected_response(items)
+
+    items = filtered(Expense).all()
     for e in items:
         if e.category_id:
             e.category = db.get(Category, e.category_id)
+    if needs_archive(db, date_from):
+        items = newest_first(items, filtered(ExpenseArchive).all(), lambda e: e.created_at)
     return items
 
 @router.get("/{expense_id}", response_model=ExpenseOut)
 def get_expense(expense_id: int, db: Session = Depends(get_db), user: User = Depends(get_current_user)):
     e = db.get(Expense, expense_id)
+    if e is None:
+        e = find_archived(db, Expense, expense_id, user.id)
     if not e or e.user_id != user.id:
         raise HTTPException(status_code=404, detail="Expense not found")
     if e.category_id:
@@ -74,33 +107,60 @@ def get_expense(expense_id: int, db: Session = Depends(get_db), user: User = Dep
     return e
 
 @router.put("/{expense_id}", response_model=ExpenseOut)
-def update_expense(expense_id: int, payload: ExpenseCreate, db: Session = Depends(get_db), user: User = Depends(get_current_user)):
+def update_expense(
+    expense_id: int,
+    payload: ExpenseCreate,
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user),
+    idem: Idempotency = Depends(idempotency),
+):
+    if (replayed := idem.replay()) is not None:
+        return replayed
     e = db.get(Expense, expense_id)
+    if e is None:
+        e = unarchive(db, Expense, expense_id, user.id)
     if not e or e.user_id != user.id:
         raise HTTPException(status_code=404, detail="Expense not found")
 
-    user.balance = (user.balance or 0) + float(e.amount) - float(payload.amount)
+    amount_cents = to_cents(payload.amount)
+    if amount_cents <= 0:
+        raise HTTPException(status_code=400, detail="Amount must be positive")
+    user.balance_cents = (user.balance_cents or 0) + e.amount_cents - amount_cents
 
     if payload.category_id is not None:
         if not db.get(Category, payload.category_id):
             raise HTTPException(status_code=400, detail="Invalid category_id")
 
-    e.description = payload.description
-    e.amount = float(payload.amount)
+    forget_expense(db, e.user_id, e.category_id, e.amount_cents)
+    e.description_ref = describe(db, payload.description)
+    e.amount_cents = amount_cents
     e.category_id = payload.category_id
-    db.commit()
+    record_expense(db, e)
+    if (stored := idem.commit(status.HTTP_200_OK, lambda: ExpenseOut.model_validate(e))) is not None:
+        return stored
     db.refresh(e)
     if e.category_id:
         e.category = db.get(Category, e.category_id)
     return e
 
 @router.delete("/{expense_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_expense(expense_id: int, db: Session = Depends(get_db), user: User = Depends(get_current_user)):
+def delete_expense(
+    expense_id: int,
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user),
+    idem: Idempotency = Depends(idempotency),
+):
+    if (replayed := idem.replay()) is not None:
+        return replayed
     e = db.get(Expense, expense_id)
+    if e is None:
+        e = unarchive(db, Expense, expense_id, user.id)
     if not e or e.user_id != user.id:
         raise HTTPException(status_code=404, detail="Expense not found")
 
-    user.balance = (user.balance or 0) + float(e.amount)
+    user.balance_cents = (user.balance_cents or 0) + e.amount_cents
+    forget_expense(db, e.user_id, e.category_id, e.amount_cents)
     db.delete(e)
-    db.commit()
+    if (stored := idem.commit(status.HTTP_204_NO_CONTENT)) is not None:
+        return stored
     return
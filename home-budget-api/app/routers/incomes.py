@@ -3,8 +3,13 @@ from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime, UTC
 from ..auth.deps import get_db, get_current_user
-from ..models import Income, User
+from ..archive import needs_archive, find_archived, unarchive, newest_first
+from ..money import to_cents
+from ..projection import INCOME_FIELDS, parse_fields, project, project_newest_first, projected_response
+from ..models import Income, IncomeArchive, User
 from ..schemas.income import IncomeCreate, IncomeOut
+from ..idempotency import Idempotency, idempotency
+from ..descriptions import describe
 
 router = APIRouter(prefix="/incomes", tags=["incomes"])
 
@@ -12,21 +17,26 @@ router = APIRouter(prefix="/incomes", tags=["incomes"])
 def create_income(
     payload: IncomeCreate,
     db: Session = Depends(get_db),
-    user: User = Depends(get_current_user)
+    user: User = Depends(get_current_user),
+    idem: Idempotency = Depends(idempotency),
 ):
-    if payload.amount <= 0:
+    if (replayed := idem.replay()) is not None:
+        return replayed
+    amount_cents = to_cents(payload.amount)
+    if amount_cents <= 0:
         raise HTTPException(status_code=400, detail="Amount must be positive")
 
     income = Income(
         user_id=user.id,
-        description=payload.description,
-        amount=float(payload.amount),
+        description_ref=describe(db, payload.description),
+        amount_cents=amount_cents,
         created_at=datetime.now(UTC),
     )
-    user.balance = (user.balance or 0.0) + float(payload.amount)
+    user.balance_cents = (user.balance_cents or 0) + income.amount_cents
 
     db.add(income)
-    db.commit()
+    if (stored := idem.commit(status.HTTP_201_CREATED, lambda: IncomeOut.model_validate(income))) is not None:
+        return stored
     db.refresh(income)
     return income
 
@@ -38,21 +48,40 @@ def list_incomes(
     amount_max: Optional[float] = None,
     date_from: Optional[datetime] = Query(None, description="ISO, npr. 2025-01-01T00:00:00Z"),
     date_to: Optional[datetime] = Query(None, description="ISO, npr. 2025-12-31T23:59:59Z"),
+    fields: Optional[str] = Query(None, description="samo ova polja, npr. amount,created_at"),
 ):
-    q = db.query(Income).filter(Income.user_id == user.id)
-    if amount_min is not None:
-        q = q.filter(Income.amount >= amount_min)
-    if amount_max is not None:
-        q = q.filter(Income.amount <= amount_max)
-    if date_from is not None:
-        q = q.filter(Income.created_at >= date_from)
-    if date_to is not None:
-        q = q.filter(Income.created_at <= date_to)
-    return q.order_by(Income.created_at.desc()).all()
+    names = parse_fields(fields, INCOME_FIELDS)
+
+    def filtered(model):
+        q = db.query(model).filter(model.user_id == user.id)
+        if amount_min is not None:
+            q = q.filter(model.amount_cents >= to_cents(amount_min))
+        if amount_max is not None:
+            q = q.filter(model.amount_cents <= to_cents(amount_max))
+        if date_from is not None:
+            q = q.filter(model.created_at >= date_from)
+        if date_to is not None:
+            q = q.filter(model.created_at <= date_to)
+        return q.order_by(model.created_at.desc())
+
+    if names is not None:
+        if needs_archive(db, date_from):
+            items = project_newest_first(filtered(Income), Income, filtered(IncomeArchive), IncomeArchive,
+                                         names, INCOME_FIELDS)
+        else:
+            items = project(filtered(Income), Income, names, INCOME_FIELDS)
+        return projected_response(items)
+
+    items = filtered(Income).all()
+    if needs_archive(db, date_from):
+        items = newest_first(items, filtered(IncomeArchive).all(), lambda i: i.created_at)
+    return items
 
 @router.get("/{income_id}", response_model=IncomeOut)
 def get_income(income_id: int, db: Session = Depends(get_db), user: User = Depends(get_current_user)):
     inc = db.get(Income, income_id)
+    if inc is None:
+        inc = find_archived(db, Income, income_id, user.id)
     if not inc or inc.user_id != user.id:
         raise HTTPException(status_code=404, detail="Income not found")
     return inc
@@ -63,28 +92,44 @@ def update_income(
     payload: IncomeCreate,
     db: Session = Depends(get_db),
     user: User = Depends(get_current_user),
+    idem: Idempotency = Depends(idempotency),
 ):
+    if (replayed := idem.replay()) is not None:
+        return replayed
     inc = db.get(Income, income_id)
+    if inc is None:
+        inc = unarchive(db, Income, income_id, user.id)
     if not inc or inc.user_id != user.id:
         raise HTTPException(status_code=404, detail="Income not found")
-    if payload.amount <= 0:
+    amount_cents = to_cents(payload.amount)
+    if amount_cents <= 0:
         raise HTTPException(status_code=400, detail="Amount must be positive")
+    user.balance_cents = (user.balance_cents or 0) - inc.amount_cents + amount_cents
 
-    user.balance = (user.balance or 0.0) - float(inc.amount) + float(payload.amount)
-
-    inc.description = payload.description
-    inc.amount = float(payload.amount)
-    db.commit()
+    inc.description_ref = describe(db, payload.description)
+    inc.amount_cents = amount_cents
+    if (stored := idem.commit(status.HTTP_200_OK, lambda: IncomeOut.model_validate(inc))) is not None:
+        return stored
     db.refresh(inc)
     return inc
 
 @router.delete("/{income_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_income(income_id: int, db: Session = Depends(get_db), user: User = Depends(get_current_user)):
+def delete_income(
+    income_id: int,
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user),
+    idem: Idempotency = Depends(idempotency),
+):
+    if (replayed := idem.replay()) is not None:
+        return replayed
     inc = db.get(Income, income_id)
+    if inc is None:
+        inc = unarchive(db, Income, income_id, user.id)
     if not inc or inc.user_id != user.id:
         raise HTTPException(status_code=404, detail="Income not found")
 
-    user.balance = (user.balance or 0.0) - float(inc.amount)
+    user.balance_cents = (user.balance_cents or 0) - inc.amount_cents
     db.delete(inc)
-    db.commit()
+    if (stored := idem.commit(status.HTTP_204_NO_CONTENT)) is not None:
+        return stored
     return
@@ -0,0 +1,122 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import and_, or_
+from typing import Optional
+from datetime import datetime, UTC
+from ..auth.deps import get_db, get_current_user
+from ..archive import needs_archive, unarchive
+from ..money import to_cents
+from ..anomalies import record_expense, forget_expense
+from ..descriptions import describe
+from ..models import Expense, ExpenseArchive, Income, IncomeArchive, Category, User, Tombstone, CATEGORY_SEQ
+from ..models.sync import current_seq
+from ..schemas.sync import SyncOut, SyncChanges, SyncDeleted, SyncIn, SyncApplyOut, SyncOpResult
+
+router = APIRouter(prefix="/sync", tags=["sync"])
+
+PLURAL = {"expense": "expenses", "income": "incomes", "category": "categories"}
+
+@router.get("", response_model=SyncOut)
+def pull_changes(
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user),
+    since: Optional[int] = Query(None, ge=0, description="cursor iz prethodnog odgovora; bez njega vraća sve"),
+    categories_since: Optional[int] = Query(None, ge=0, description="categories_cursor iz prethodnog odgovora; bez njega vraća sve kategorije"),
+):
+    # user data and the shared categories have separate sequences
+    cursor = current_seq(db, user.id)
+    categories_cursor = current_seq(db, CATEGORY_SEQ)
+    expenses = db.query(Expense).options(selectinload(Expense.category)).filter(Expense.user_id == user.id)
+    incomes = db.query(Income).filter(Income.user_id == user.id)
+    categories = db.query(Category)
+
+    if since is None:
+        expenses, incomes = expenses.all(), incomes.all()
+        if needs_archive(db, None):
+            expenses += db.query(ExpenseArchive).filter(ExpenseArchive.user_id == user.id).all()
+            incomes += db.query(IncomeArchive).filter(IncomeArchive.user_id == user.id).all()
+        changes = SyncChanges(expenses=expenses, incomes=incomes, categories=categories.all())
+        return SyncOut(cursor=cursor, categories_cursor=categories_cursor, full=True,
+                       changes=changes, deleted=SyncDeleted())
+
+    if since > cursor or (categories_since or 0) > categories_cursor:
+        raise HTTPException(status_code=400, detail="Unknown cursor, sync again without 'since'")
+
+    if categories_since is not None:
+        categories = categories.filter(Category.change_seq > categories_since, Category.change_seq <= categories_cursor)
+    expenses = expenses.filter(Expense.change_seq > since, Expense.change_seq <= cursor).all()
+    incomes = incomes.filter(Income.change_seq > since, Income.change_seq <= cursor).all()
+    if needs_archive(db, None):
+        # archiving keeps change_seq, so a row changed and then archived since the cursor still shows up
+        expenses += db.query(ExpenseArchive).filter(ExpenseArchive.user_id == user.id,
+                                                    ExpenseArchive.change_seq > since, ExpenseArchive.change_seq <= cursor).all()
+        incomes += db.query(IncomeArchive).filter(IncomeArchive.user_id == user.id,
+                                                  IncomeArchive.change_seq > since, IncomeArchive.change_seq <= cursor).all()
+    changes = SyncChanges(expenses=expenses, incomes=incomes, categories=categories.all())
+    deleted = SyncDeleted()
+    scopes = [and_(Tombstone.user_id == user.id, Tombstone.change_seq > since, Tombstone.change_seq <= cursor)]
+    if categories_since is not None:
+        scopes.append(and_(Tombstone.user_id.is_(None), Tombstone.change_seq > categories_since,
+                           Tombstone.change_seq <= categories_cursor))
+    tombstones = (
+        db.query(Tombstone.entity, Tombstone.entity_id)
+        .filter(or_(*scopes))
+        .order_by(Tombstone.change_seq)
+        .all()
+    )
+    for entity, entity_id in tombstones:
+        getattr(deleted, PLURAL[entity]).append(entity_id)
+    return SyncOut(cursor=cursor, categories_cursor=categories_cursor, full=False, changes=changes, deleted=deleted)
+
+@router.post("", response_model=SyncApplyOut)
+def push_changes(payload: SyncIn, db: Session = Depends(get_db), user: User = Depends(get_current_user)):
+    balance_delta = 0
+    applied = []
+
+    for i, op in enumerate(payload.operations):
+        model, sign = (Expense, -1) if op.entity == "expense" else (Income, 1)
+
+        if op.op in ("create", "update"):
+            if op.description is None or op.amount is None:
+                raise HTTPException(status_code=400, detail=f"operations[{i}]: description and amount are required")
+            if to_cents(op.amount) <= 0:
+                raise HTTPException(status_code=400, detail=f"operations[{i}]: Amount must be positive")
+            if model is Expense and op.category_id is not None and not db.get(Category, op.category_id):
+                raise HTTPException(status_code=400, detail=f"operations[{i}]: Invalid category_id")
+
+        if op.op == "create":
+            obj = model(user_id=user.id, description_ref=describe(db, op.description), amount_cents=to_cents(op.amount),
+                        created_at=op.created_at or datetime.now(UTC))
+            if model is Expense:
+                obj.category_id = op.category_id
+                record_expense(db, obj)
+            db.add(obj)
+            balance_delta += sign * obj.amount_cents
+        else:
+            obj = (db.get(model, op.id) or unarchive(db, model, op.id, user.id)) if op.id is not None else None
+            if not obj or obj.user_id != user.id:
+                raise HTTPException(status_code=404, detail=f"operations[{i}]: {model.__name__} not found")
+            if op.op == "update":
+                amount_cents = to_cents(op.amount)
+                balance_delta += sign * (amount_cents - obj.amount_cents)
+                if model is Expense:
+                    forget_expense(db, obj.user_id, obj.category_id, obj.amount_cents)
+                obj.description_ref = describe(db, op.description)
+                obj.amount_cents = amount_cents
+                if model is Expense:
+                    obj.category_id = op.category_id
+                    record_expense(db, obj)
+            else:
+                balance_delta -= sign * obj.amount_cents
+                if model is Expense:
+                    forget_expense(db, obj.user_id, obj.category_id, obj.amount_cents)
+                db.delete(obj)
+        applied.append((op, obj))
+
+    # the whole batch moves the balance once
+    user.balance_cents = (user.balance_cents or 0) + balance_delta
+    db.flush()
+    results = [SyncOpResult(op=op.op, entity=op.entity, id=obj.id, client_ref=op.client_ref) for op, obj in applied]
+    cursor = current_seq(db, user.id)
+    db.commit()
+    return SyncApplyOut(cursor=cursor, balance=user.balance, results=results)
@@ -20,5 +20,8 @@ class ExpenseCreate(ExpenseBase):
 class ExpenseOut(ExpenseBase):
     id: int
     created_at: datetime
+    updated_at: Optional[datetime] = None
+    anomaly_z: Optional[float] = None
+    is_anomaly: Optional[bool] = None
     category: Optional[CategoryOut] = None
     model_config = ConfigDict(from_attributes=True)
@@ -18,4 +18,5 @@ class IncomeCreate(IncomeBase):
 class IncomeOut(IncomeBase):
     id: int
     created_at: datetime
+    updated_at: Optional[datetime] = None
     model_config = ConfigDict(from_attributes=True)
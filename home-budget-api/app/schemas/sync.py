@@ -0,0 +1,56 @@
+from pydantic import BaseModel, Field
+from datetime import datetime
+from typing import List, Literal, Optional
+from .category import CategoryOut
+from .expense import ExpenseOut
+from .income import IncomeOut
+
+class SyncChanges(BaseModel):
+    expenses: List[ExpenseOut] = []
+    incomes: List[IncomeOut] = []
+    categories: List[CategoryOut] = []
+
+class SyncDeleted(BaseModel):
+    expenses: List[int] = []
+    incomes: List[int] = []
+    categories: List[int] = []
+
+class SyncOut(BaseModel):
+    cursor: int
+    categories_cursor: int = 0
+    full: bool
+    changes: SyncChanges
+    deleted: SyncDeleted
+
+class SyncOp(BaseModel):
+    op: Literal["create", "update", "delete"]
+    entity: Literal["expense", "income"]
+    id: Optional[int] = None
+    client_ref: Optional[str] = None
+    description: Optional[str] = None
+    amount: Optional[float] = None
+    category_id: Optional[int] = None
+    created_at: Optional[datetime] = None
+
+class SyncIn(BaseModel):
+    operations: List[SyncOp] = Field(max_length=1000)
+
+    model_config = {
+        "json_schema_extra": {
+            "example": {"operations": [
+                {"op": "create", "entity": "expense", "client_ref": "tmp-1", "description": "pizza", "amount": 50.0, "category_id": 1},
+                {"op": "delete", "entity": "income", "id": 7},
+            ]}
+        }
+    }
+
+class SyncOpResult(BaseModel):
+    op: str
+    entity: str
+    id: int
+    client_ref: Optional[str] = None
+
+class SyncApplyOut(BaseModel):
+    cursor: int
+    balance: float
+    results: List[SyncOpResult]
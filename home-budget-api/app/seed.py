@@ -1,28 +1,45 @@
 from typing import Iterable
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, select
 
 from .models import Category
 from .db import SessionLocal
 
 DEFAULT_CATEGORIES = ["food", "car", "accommodation", "gifts", "utilities", "entertainment"]
 
+def _insert_ignore(db: Session, rows: list):
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        return None
+    return insert(Category).values(rows).on_conflict_do_nothing(index_elements=[Category.name])
+
 def _seed_categories_session(db: Session, names: Iterable[str]) -> int:
-    created = 0
+    wanted = {}
     for raw_name in names:
         name = (raw_name or "").strip()
-        if not name:
-            continue
-        exists = (
-            db.query(Category)
-            .filter(func.lower(Category.name) == name.lower())
-            .first()
-        )
-        if not exists:
-            db.add(Category(name=name))
-            created += 1
-    if created:
-        db.commit()
+        if name:
+            wanted.setdefault(name.lower(), name)
+    if not wanted:
+        return 0
+
+    existing = set(db.execute(
+        select(func.lower(Category.name)).where(func.lower(Category.name).in_(list(wanted)))
+    ).scalars())
+    rows = [{"name": name} for key, name in wanted.items() if key not in existing]
+    if not rows:
+        return 0
+
+    stmt = _insert_ignore(db, rows)
+    if stmt is None:
+        db.add_all(Category(name=r["name"]) for r in rows)
+        created = len(rows)
+    else:
+        created = db.execute(stmt).rowcount
+    db.commit()
     return created
 
 def seed_categories(names: Iterable[str] = None) -> int:
@@ -0,0 +1,324 @@
+import argparse
+import bisect
+import hashlib
+from typing import List, Optional
+
+from sqlalchemy import create_engine, delete, update, insert, select, text, Engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from .archive import ARCHIVES, archive_horizon, raise_horizon
+from .config import settings
+from .db import engine as default_engine, SessionLocal, init_db
+from .models import (
+    User, UserShard, Category, Description, Expense, Income, ExpenseArchive, IncomeArchive,
+    SpendingStat, SyncCounter, Tombstone, IdempotencyKey,
+)
+from .models.sync import reserve_change_seqs, current_seq, CATEGORY_SEQ
+from .descriptions import LRUCache, intern_description
+
+VNODES = 64
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.md5(key.encode()).digest()[:8], "big")
+
+class ShardMap:
+    """Routes each user to one of N databases.
+
+    New users are placed on a consistent-hash ring (so adding a shard moves only
+    ~1/N of them); the placement is then recorded in the directory's user_shard
+    table, which stays authoritative until the rebalance tool moves the user.
+    """
+
+    def __init__(self, directory: Engine, shards: Optional[List[Engine]] = None, directory_sessions=None):
+        self.directory_engine = directory
+        self.Directory = directory_sessions or sessionmaker(autocommit=False, autoflush=False, bind=directory)
+        self.engines = shards or [directory]
+        self.sessionmakers = [
+            self.Directory if e is directory else sessionmaker(autocommit=False, autoflush=False, bind=e)
+            for e in self.engines
+        ]
+        # user_id -> shard; other processes' entries go stale after a move, which the
+        # moved user's `away` row on the old shard reveals (see auth.deps.get_current_user)
+        self._placements = LRUCache(settings.SHARD_PLACEMENT_CACHE_SIZE)
+        ring = sorted((_hash(f"shard-{i}#{v}"), i) for i in range(len(self.engines)) for v in range(VNODES))
+        self._ring_keys = [h for h, _ in ring]
+        self._ring_shards = [i for _, i in ring]
+
+    @classmethod
+    def from_settings(cls) -> "ShardMap":
+        shards = [default_engine if url == settings.DATABASE_URL else create_engine(url, future=True)
+                  for url in settings.SHARD_URLS]
+        return cls(default_engine, shards or None, SessionLocal)
+
+    @property
+    def sharded(self) -> bool:
+        return len(self.engines) > 1
+
+    def ring_shard(self, user_id: int) -> int:
+        i = bisect.bisect(self._ring_keys, _hash(f"user-{user_id}")) % len(self._ring_keys)
+        return self._ring_shards[i]
+
+    def shard_for(self, user_id: int) -> int:
+        if not self.sharded:
+            return 0
+        cached = self._placements.get((user_id,))
+        if cached is not None:
+            return cached
+        with self.Directory() as d:
+            placed = d.get(UserShard, user_id)
+        if placed is None:
+            return self.ring_shard(user_id)
+        self._placements.put((user_id,), placed.shard)
+        return placed.shard
+
+    def forget(self, user_id: int) -> Optional[int]:
+        """Drop the cached placement of user_id; returns the shard it pointed to."""
+        return self._placements.pop((user_id,))
+
+    def session(self, shard: int) -> Session:
+        return self.sessionmakers[shard]()
+
+    def session_for_user(self, user_id: Optional[int]) -> Session:
+        if user_id is None:
+            return self.Directory()
+        return self.session(self.shard_for(user_id))
+
+    def replicas(self) -> List[int]:
+        """Shards that are separate databases from the directory."""
+        return [i for i, e in enumerate(self.engines) if e is not self.directory_engine]
+
+    def init_all(self) -> None:
+        init_db(self.directory_engine)
+        for i in self.replicas():
+            init_db(self.engines[i])
+        if self.sharded:
+            for i, e in enumerate(self.engines):
+                reserve_id_floor(e, i * settings.SHARD_ID_SPAN)
+
+def reserve_id_floor(bind: Engine, floor: int) -> None:
+    """Make the next expense/income ids on bind start above floor; a no-op once they do."""
+    if floor <= 0:
+        return
+    with bind.begin() as conn:
+        for model in (Expense, Income):
+            table = model.__tablename__
+            if conn.dialect.name == "postgresql":
+                seq = conn.execute(text("SELECT pg_get_serial_sequence(:t, 'id')"), {"t": table}).scalar()
+                conn.execute(text(f"SELECT setval(:seq, :floor) FROM {seq} WHERE last_value < :floor"),
+                             {"seq": seq, "floor": floor})
+            elif conn.dialect.name == "sqlite":
+                # AUTOINCREMENT tables only (created by this version); sqlite_sequence is editable.
+                # Older files lack it: move_user still refuses colliding ids there.
+                if not conn.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_sequence'")).first():
+                    return
+                seen = conn.execute(text("SELECT seq FROM sqlite_sequence WHERE name = :t"), {"t": table}).first()
+                if seen is None:
+                    conn.execute(text("INSERT INTO sqlite_sequence (name, seq) VALUES (:t, :floor)"),
+                                 {"t": table, "floor": floor})
+                elif seen.seq < floor:
+                    conn.execute(text("UPDATE sqlite_sequence SET seq = :floor WHERE name = :t"),
+                                 {"t": table, "floor": floor})
+
+shard_map = ShardMap.from_settings()
+
+def _copy_user_row(src: User) -> User:
+    return User(id=src.id, email=src.email, hashed_password=src.hashed_password, balance_cents=src.balance_cents,
+                away=False)
+
+def place_user(shards: ShardMap, directory: Session, user: User) -> int:
+    """Assign a freshly registered (flushed, not yet committed) user to a shard and copy the user row there.
+
+    The caller commits the directory afterwards, so a failed shard write leaves no
+    account behind; a directory commit that fails after it only orphans a shard row
+    that the next registration reusing the id overwrites.
+    """
+    if not shards.sharded:
+        return 0
+    shard = shards.ring_shard(user.id)
+    directory.add(UserShard(user_id=user.id, shard=shard))
+    if shard in shards.replicas():
+        with shards.session(shard) as s:
+            s.merge(_copy_user_row(user))
+            s.commit()
+        # the balance lives on the shard; writes never touch the directory copy
+        user.balance_cents = 0
+    return shard
+
+def sync_categories(shards: ShardMap) -> None:
+    """Make every shard's category table match the directory (ids included)."""
+    if not shards.replicas():
+        return
+    with shards.Directory() as d:
+        master = {c.id: c.name for c in d.query(Category).all()}
+    for i in shards.replicas():
+        with shards.session(i) as s:
+            local = {c.id: c for c in s.query(Category).all()}
+            for cid, cat in local.items():
+                if cid not in master:
+                    s.query(SpendingStat).filter(SpendingStat.category_id == cid).delete()
+                    s.delete(cat)
+            s.flush()
+            for cid, name in master.items():
+                if cid not in local:
+                    s.add(Category(id=cid, name=name))
+                elif local[cid].name != name:
+                    local[cid].name = name
+            s.commit()
+
+_USER_TABLES = (Expense, Income, ExpenseArchive, IncomeArchive, SpendingStat, Tombstone, IdempotencyKey)
+
+def _purge_user(s: Session, user_id: int, keep_user_row: bool) -> None:
+    # bulk deletes on purpose: moving data is not a user-visible deletion
+    for model in _USER_TABLES:
+        s.execute(delete(model).where(model.user_id == user_id))
+    if keep_user_row:
+        s.execute(update(User).where(User.id == user_id).values(balance_cents=0, away=True))
+    else:
+        s.execute(delete(User).where(User.id == user_id))
+
+def _raise_counter(src: Session, dst: Session, scope: int) -> None:
+    src_seq = current_seq(src, scope)
+    if current_seq(dst, scope) < src_seq:
+        updated = dst.execute(update(SyncCounter).where(SyncCounter.id == scope).values(value=src_seq)).rowcount
+        if not updated:
+            dst.execute(insert(SyncCounter).values(id=scope, value=src_seq))
+
+MOVE_ATTEMPTS = 3
+
+def _user_rows(s: Session, model, user_id: int, without: tuple = ()) -> List[dict]:
+    rows = [dict(r) for r in s.execute(select(model.__table__).where(model.user_id == user_id)).mappings()]
+    for row in rows:
+        for name in without:
+            del row[name]
+    return rows
+
+def _copy_user(shards: ShardMap, s: Session, d: Session, user_id: int, dst: int) -> None:
+    """Write the user's rows from session s into session d, uncommitted.
+
+    Expenses and incomes keep their ids (unique across shards, see reserve_id_floor)
+    and change_seq, so URLs, open edit screens, idempotent retries and sync cursors
+    stay valid. Core inserts skip the ORM's change stamping.
+    """
+    user = s.get(User, user_id)
+    # leftovers from an interrupted move; the directory keeps its auth copy of the user
+    _purge_user(d, user_id, keep_user_row=dst not in shards.replicas())
+    # the user's cursors were handed out by the source's counters
+    _raise_counter(s, d, user_id)
+    _raise_counter(s, d, CATEGORY_SEQ)
+    d.merge(_copy_user_row(user))
+    d.flush()
+
+    # description ids are per shard
+    local = {}
+    def description_id(src_id: int) -> int:
+        if src_id not in local:
+            local[src_id] = intern_description(d, s.get(Description, src_id).text)
+        return local[src_id]
+
+    for hot, cold in ARCHIVES:
+        rows = {model: _user_rows(s, model, user_id) for model in (hot, cold)}
+        ids = [row["id"] for batch in rows.values() for row in batch]
+        taken = [id for model in (hot, cold) for id in d.execute(select(model.id).where(model.id.in_(ids))).scalars()]
+        if taken:
+            # only data written before shards had disjoint id ranges can collide
+            raise RuntimeError(f"{hot.__tablename__} ids {sorted(taken)[:5]} already exist on shard {dst}")
+        for model, batch in rows.items():
+            for row in batch:
+                row["description_id"] = description_id(row["description_id"])
+            if batch:
+                d.execute(insert(model.__table__), batch)
+    for model, without in ((Tombstone, ("id",)), (SpendingStat, ("id",)), (IdempotencyKey, ())):
+        if batch := _user_rows(s, model, user_id, without):
+            d.execute(insert(model.__table__), batch)
+    # the destination must read its archive for everything the source did
+    if (horizon := archive_horizon(s)) is not None:
+        raise_horizon(d, horizon)
+
+def move_user(shards: ShardMap, user_id: int, dst: int) -> bool:
+    """Copy a user's data to shard dst, repoint the directory, then drop the old copy.
+
+    Rows keep their ids and change sequences; archived rows land in the destination's
+    archive tables and its archive horizon is raised to the source's. The user's counter
+    on the destination is raised to the source's first, so cursors the client holds stay valid.
+
+    The source's user row is marked away for the whole copy, so the user's requests get
+    503 + Retry-After. Every data write bumps the user's change counter; the copy is
+    redone if the counter moved while it ran (a write that started before the flag).
+    """
+    src = shards.shard_for(user_id)
+    if src == dst:
+        return False
+
+    with shards.session(src) as s, shards.session(dst) as d:
+        user = s.get(User, user_id)
+        if user is None:
+            return False
+        user.away = True
+        s.commit()
+        # on SQLite the repoint must share the source's transaction when both are the directory
+        same_db = shards.engines[src] is shards.directory_engine
+        try:
+            for _ in range(MOVE_ATTEMPTS):
+                seen = current_seq(s, user_id)
+                s.rollback()
+                _copy_user(shards, s, d, user_id, dst)
+                # locks the counter: a writer still in flight commits (and bumps it) first
+                if reserve_change_seqs(s, user_id, 0) == seen:
+                    break
+                s.rollback()
+                d.rollback()
+            else:
+                raise RuntimeError(f"user {user_id} kept writing during the move")
+            d.commit()
+
+            if same_db:
+                s.merge(UserShard(user_id=user_id, shard=dst))
+            else:
+                with shards.Directory() as directory:
+                    directory.merge(UserShard(user_id=user_id, shard=dst))
+                    directory.commit()
+        except BaseException:
+            s.rollback()
+            s.execute(update(User).where(User.id == user_id).values(away=False))
+            s.commit()
+            raise
+        shards.forget(user_id)
+
+        _purge_user(s, user_id, keep_user_row=src not in shards.replicas())
+        s.commit()
+    return True
+
+def rebalance(shards: ShardMap, dry_run: bool = False) -> List[tuple]:
+    """Move every user whose recorded shard differs from its place on the ring."""
+    with shards.Directory() as d:
+        placed = [(p.user_id, p.shard) for p in d.query(UserShard).all()]
+    moves = [(uid, cur, shards.ring_shard(uid)) for uid, cur in placed if cur != shards.ring_shard(uid)]
+    if not dry_run:
+        sync_categories(shards)
+        for uid, _, dst in moves:
+            move_user(shards, uid, dst)
+    return moves
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Shard maintenance.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    reb = sub.add_parser("rebalance", help="move users to their consistent-hash shard (e.g. after adding a shard)")
+    reb.add_argument("--dry-run", action="store_true")
+    mv = sub.add_parser("move", help="move one user to a given shard")
+    mv.add_argument("user_id", type=int)
+    mv.add_argument("shard", type=int)
+    sub.add_parser("sync-categories", help="replicate the directory's categories to every shard")
+    args = parser.parse_args(argv)
+
+    shard_map.init_all()
+    if args.command == "rebalance":
+        for uid, cur, dst in rebalance(shard_map, args.dry_run):
+            print(f"user {uid}: shard {cur} -> {dst}")
+    elif args.command == "move":
+        sync_categories(shard_map)
+        print("moved" if move_user(shard_map, args.user_id, args.shard) else "nothing to do")
+    else:
+        sync_categories(shard_map)
+
+if __name__ == "__main__":
+    main()
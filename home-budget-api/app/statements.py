@@ -0,0 +1,186 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, Iterator, List, Tuple
+
+from sqlalchemy import and_, case, create_engine, func, select, Engine
+from sqlalchemy.orm import Session
+
+from .archive import archive_horizon, reaches_archive, source
+from .config import settings
+from .models import Category, Description, Expense, Income, User, UserShard
+from .money import from_cents
+from .periods import period_range
+from . import sharding
+
+# Monthly (or any period) statements for every user, in the same shape as
+# /analytics/summary. Users are split into chunks per shard and each chunk is
+# computed with a handful of GROUP BY user_id queries in a worker process that
+# owns its own engines; the parent only writes the NDJSON output.
+
+Chunk = Tuple[int, List[int]]
+
+_engines: Dict[int, Engine] = {}
+_shard_urls: List[str] = []
+
+def _init_worker(shard_urls: List[str]) -> None:
+    global _shard_urls
+    _shard_urls = shard_urls
+    _engines.clear()
+
+def _engine(shard: int) -> Engine:
+    if shard not in _engines:
+        _engines[shard] = create_engine(_shard_urls[shard], future=True)
+    return _engines[shard]
+
+def chunk_statements(db: Session, user_ids: List[int], start: datetime, end: datetime, period_name: str) -> List[dict]:
+    """Statements for all user_ids at once: five queries regardless of chunk size."""
+    horizon = archive_horizon(db)
+    in_period, lifetime = reaches_archive(horizon, start), horizon is not None
+
+    def totals(model):
+        src = source(model, in_period or lifetime).c
+        in_range = and_(src.created_at >= start, src.created_at <= end)
+        return {r.user_id: r for r in db.execute(
+            select(src.user_id,
+                   func.coalesce(func.sum(case((in_range, src.amount_cents), else_=0)), 0).label("period"),
+                   func.coalesce(func.sum(case((in_range, 1), else_=0)), 0).label("count"),
+                   func.coalesce(func.sum(src.amount_cents), 0).label("lifetime"))
+            .where(src.user_id.in_(user_ids))
+            .group_by(src.user_id)
+        )}
+
+    spent, earned = totals(Expense), totals(Income)
+
+    exp = source(Expense, in_period).c
+    cat_label = func.coalesce(Category.name, "uncategorized")
+    by_category: Dict[int, list] = {}
+    for r in db.execute(
+        select(exp.user_id, cat_label.label("category"), func.sum(exp.amount_cents).label("total"))
+        .outerjoin(Category, exp.category_id == Category.id)
+        .where(exp.user_id.in_(user_ids), exp.created_at >= start, exp.created_at <= end)
+        .group_by(exp.user_id, cat_label)
+        .order_by(exp.user_id, func.sum(exp.amount_cents).desc())
+    ):
+        by_category.setdefault(r.user_id, []).append({"category": r.category, "total": from_cents(r.total)})
+
+    inc = source(Income, in_period).c
+    per_source = (
+        select(inc.user_id, inc.description_id, func.sum(inc.amount_cents).label("total"))
+        .where(inc.user_id.in_(user_ids), inc.created_at >= start, inc.created_at <= end)
+        .group_by(inc.user_id, inc.description_id)
+        .subquery()
+    )
+    by_source: Dict[int, list] = {}
+    for r in db.execute(
+        select(per_source.c.user_id, Description.text, per_source.c.total)
+        .join(Description, Description.id == per_source.c.description_id)
+        .order_by(per_source.c.user_id, per_source.c.total.desc())
+    ):
+        by_source.setdefault(r.user_id, []).append({"source": r.text, "total": from_cents(r.total)})
+
+    balances = dict(db.execute(select(User.id, User.balance_cents).where(User.id.in_(user_ids))).all())
+
+    period = {"name": period_name, "from": start.isoformat(), "to": end.isoformat()}
+    statements = []
+    for uid in user_ids:
+        s, e = spent.get(uid), earned.get(uid)
+        spent_total, earned_total = (s.period if s else 0), (e.period if e else 0)
+        lifetime_spent, lifetime_earned = (s.lifetime if s else 0), (e.lifetime if e else 0)
+        balance = balances.get(uid) or 0
+        statements.append({
+            "user_id": uid,
+            "period": period,
+            "totals": {
+                "earned": from_cents(earned_total),
+                "spent": from_cents(spent_total),
+                "net": from_cents(earned_total - spent_total),
+                "count_expenses": int(s.count if s else 0),
+            },
+            "by_category": by_category.get(uid, []),
+            "by_source": by_source.get(uid, []),
+            "account": {
+                "current_balance": from_cents(balance),
+                "initial_estimate": from_cents(balance + lifetime_spent - lifetime_earned),
+                "lifetime_spent": from_cents(lifetime_spent),
+                "lifetime_earned": from_cents(lifetime_earned),
+            },
+        })
+    return statements
+
+def _run_chunk(args) -> List[dict]:
+    (shard, user_ids), start, end, period_name = args
+    with Session(_engine(shard)) as db:
+        return chunk_statements(db, user_ids, start, end, period_name)
+
+def plan_chunks(directory: Engine, shards: sharding.ShardMap, chunk_size: int) -> List[Chunk]:
+    """Split every user id into chunks that each live on a single shard."""
+    with Session(directory) as d:
+        user_ids = d.execute(select(User.id).order_by(User.id)).scalars().all()
+        placed = dict(d.execute(select(UserShard.user_id, UserShard.shard)).all()) if shards.sharded else {}
+    by_shard: Dict[int, List[int]] = {}
+    for uid in user_ids:
+        shard = placed.get(uid, shards.ring_shard(uid)) if shards.sharded else 0
+        by_shard.setdefault(shard, []).append(uid)
+    return [(shard, ids[i:i + chunk_size]) for shard, ids in sorted(by_shard.items())
+            for i in range(0, len(ids), chunk_size)]
+
+def generate(
+    directory_url: str,
+    shard_urls: List[str],
+    start: datetime,
+    end: datetime,
+    period_name: str,
+    workers: int,
+    chunk_size: int = 500,
+) -> Iterator[dict]:
+    directory = create_engine(directory_url, future=True)
+    engines = [directory if url == directory_url else create_engine(url, future=True) for url in shard_urls]
+    try:
+        chunks = plan_chunks(directory, sharding.ShardMap(directory, engines), chunk_size)
+    finally:
+        for engine in {directory, *engines}:
+            engine.dispose()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(shard_urls,)) as pool:
+        for statements in pool.map(_run_chunk, [(c, start, end, period_name) for c in chunks]):
+            yield from statements
+
+def write_statements(path: str, statements: Iterator[dict]) -> int:
+    count = 0
+    with open(path, "w", encoding="utf-8") as out:
+        for statement in statements:
+            out.write(json.dumps(statement, ensure_ascii=False) + "\n")
+            count += 1
+    return count
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Write a statement for every user as NDJSON.")
+    parser.add_argument("--period", default=None, help="this_month | last_month | ... (default: last_month)")
+    parser.add_argument("--date-from", type=datetime.fromisoformat, default=None)
+    parser.add_argument("--date-to", type=datetime.fromisoformat, default=None)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-size", type=int, default=500)
+    parser.add_argument("--out", default=None, help="output file (default: statements-<from>.ndjson)")
+    args = parser.parse_args(argv)
+
+    try:
+        start, end, period_name = period_range(args.period, args.date_from, args.date_to)
+    except ValueError as exc:
+        parser.error(str(exc))
+    out = args.out or f"statements-{start:%Y-%m-%d}.ndjson"
+
+    sharding.shard_map.init_all()
+    t0 = time.perf_counter()
+    count = write_statements(out, generate(
+        settings.DATABASE_URL, settings.SHARD_URLS or [settings.DATABASE_URL],
+        start, end, period_name, args.workers, args.chunk_size,
+    ))
+    elapsed = time.perf_counter() - t0
+    print(f"{count} statements -> {out} in {elapsed:.2f} s "
+          f"({count / elapsed if elapsed else 0:.0f} users/s, {args.workers} workers)")
+
+if __name__ == "__main__":
+    main()
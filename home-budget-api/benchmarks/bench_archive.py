@@ -0,0 +1,58 @@
+"""Recent-range query latency before and after moving old rows to the archive tables.
+
+Run from home-budget-api/:  python -m benchmarks.bench_archive [years] [rows_per_day]
+"""
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.archive import archive_old_rows, needs_archive
+from app.db import init_db
+from app.descriptions import intern_description
+from app.models import Expense, User
+
+USERS = 20
+
+def _recent_query(db, user_id: int, date_from: datetime) -> float:
+    t0 = time.perf_counter()
+    for _ in range(50):
+        db.query(Expense).filter(Expense.user_id == user_id, Expense.created_at >= date_from)\
+            .order_by(Expense.created_at.desc()).all()
+        needs_archive(db, date_from)
+    return (time.perf_counter() - t0) / 50 * 1000
+
+def main(years: int = 10, rows_per_day: int = 20) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{tmp}/bench.db")
+        init_db(engine)
+        db = sessionmaker(bind=engine)()
+        db.add_all(User(id=i, email=f"u{i}@example.com", hashed_password="x") for i in range(1, USERS + 1))
+
+        description_id = intern_description(db, "bench")
+        now = datetime.utcnow()
+        rows = [
+            {"user_id": random.randint(1, USERS), "description_id": description_id, "amount_cents": random.randint(100, 10000),
+             "created_at": now - timedelta(days=d, seconds=random.randint(0, 86399))}
+            for d in range(365 * years) for _ in range(rows_per_day)
+        ]
+        db.execute(Expense.__table__.insert(), rows)
+        db.commit()
+
+        date_from = now - timedelta(days=30)
+        print(f"rows: {len(rows)}")
+        print(f"before archive: {_recent_query(db, 1, date_from):.2f} ms/query")
+        t0 = time.perf_counter()
+        moved = archive_old_rows(db, now - timedelta(days=365))
+        print(f"archived {moved} in {time.perf_counter() - t0:.2f} s")
+        print(f"after archive:  {_recent_query(db, 1, date_from):.2f} ms/query")
+        db.close()
+        engine.dispose()
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:3]]
+    main(*args)
@@ -0,0 +1,110 @@
+"""Free-text descriptions vs the interned description dictionary.
+
+Run from home-budget-api/:  python -m benchmarks.bench_descriptions [rows]
+Reports on-disk size and GROUP BY description time for both layouts, plus the
+cost of resolving a description on the write path with and without the LRU.
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+from sqlalchemy import BigInteger, Column, ForeignKey, Integer, MetaData, String, Table, create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+
+from app import descriptions
+from app.db import init_db
+from app.descriptions import intern_description
+
+metadata = MetaData()
+free_text = Table("expense", metadata,
+                  Column("id", Integer, primary_key=True), Column("user_id", Integer),
+                  Column("description", String(255)), Column("amount_cents", BigInteger))
+dictionary = Table("description", metadata,
+                   Column("id", Integer, primary_key=True), Column("text", String(255), unique=True))
+interned = Table("expense_interned", metadata,
+                 Column("id", Integer, primary_key=True), Column("user_id", Integer),
+                 Column("description_id", Integer, ForeignKey("description.id")), Column("amount_cents", BigInteger))
+
+MERCHANTS = [f"{name} {city}" for name in ("Konzum", "Lidl", "Spar", "Kaufland", "dm drogerie", "Tisak",
+                                            "INA benzinska", "Pekara Dubravica", "Bolt", "Netflix")
+             for city in ("Zagreb", "Split", "Rijeka", "Osijek", "Zadar", "Pula", "Varaždin", "online")]
+
+def _size(engine) -> int:
+    with engine.connect() as conn:
+        conn.exec_driver_sql("VACUUM")
+    return os.path.getsize(engine.url.database)
+
+def _timed(conn, stmt, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        conn.execute(stmt).all()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+def main(rows: int = 1_000_000) -> None:
+    rng = random.Random(7)
+    # a few merchants dominate, like real spending
+    weights = [1 / (i + 1) for i in range(len(MERCHANTS))]
+    data = [(rng.randint(1, 500), text, rng.randint(100, 50_000))
+            for text in rng.choices(MERCHANTS, weights, k=rows)]
+    ids = {text: i + 1 for i, text in enumerate(MERCHANTS)}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        before = create_engine(f"sqlite:///{tmp}/text.db")
+        after = create_engine(f"sqlite:///{tmp}/interned.db")
+        free_text.create(before)
+        dictionary.create(after)
+        interned.create(after)
+        with before.begin() as conn:
+            conn.execute(free_text.insert(), [{"user_id": u, "description": t, "amount_cents": c} for u, t, c in data])
+        with after.begin() as conn:
+            conn.execute(dictionary.insert(), [{"id": i, "text": t} for t, i in ids.items()])
+            conn.execute(interned.insert(), [{"user_id": u, "description_id": ids[t], "amount_cents": c} for u, t, c in data])
+
+        by_text = (select(free_text.c.description, func.sum(free_text.c.amount_cents))
+                   .group_by(free_text.c.description))
+        totals = (select(interned.c.description_id, func.sum(interned.c.amount_cents).label("total"))
+                  .group_by(interned.c.description_id).subquery())
+        by_id = select(dictionary.c.text, totals.c.total).join(totals, dictionary.c.id == totals.c.description_id)
+        with before.connect() as conn:
+            t_before = _timed(conn, by_text)
+        with after.connect() as conn:
+            t_after = _timed(conn, by_id)
+        size_before, size_after = _size(before), _size(after)
+        before.dispose()
+        after.dispose()
+
+        # write path: text -> id through the real dictionary table
+        engine = create_engine(f"sqlite:///{tmp}/app.db")
+        init_db(engine)
+        db = sessionmaker(bind=engine)()
+        for text in MERCHANTS:
+            intern_description(db, text)
+        db.commit()
+        lookups = [rng.choice(MERCHANTS) for _ in range(20_000)]
+        descriptions.cache.clear()
+        descriptions.cache.size = 0
+        t0 = time.perf_counter()
+        for text in lookups:
+            intern_description(db, text)
+        t_uncached = time.perf_counter() - t0
+        descriptions.cache.size = len(MERCHANTS)
+        t0 = time.perf_counter()
+        for text in lookups:
+            intern_description(db, text)
+        t_cached = time.perf_counter() - t0
+        db.close()
+        engine.dispose()
+
+    print(f"rows: {rows}, distinct descriptions: {len(MERCHANTS)}")
+    print(f"{'':26}{'free text':>12}{'interned':>12}")
+    print(f"{'database size (MB)':26}{size_before / 2**20:>12.1f}{size_after / 2**20:>12.1f}")
+    print(f"{'GROUP BY description (s)':26}{t_before:>12.4f}{t_after:>12.4f}")
+    print(f"{'write-path lookup (us)':26}{t_uncached / len(lookups) * 1e6:>12.1f}{t_cached / len(lookups) * 1e6:>12.1f}"
+          "   (SELECT vs LRU)")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,70 @@
+"""SUM / GROUP BY over Numeric(12, 2) amounts vs BIGINT cents.
+
+Run from home-budget-api/:  python -m benchmarks.bench_money [rows]
+Reports query time for both layouts and how far each total is from the exact sum.
+"""
+import random
+import sys
+import tempfile
+import time
+from decimal import Decimal
+
+from sqlalchemy import BigInteger, Column, Integer, MetaData, Numeric, Table, create_engine, func, select
+
+from app.money import from_cents
+
+metadata = MetaData()
+legacy = Table("legacy_expense", metadata,
+               Column("user_id", Integer), Column("category_id", Integer), Column("amount", Numeric(12, 2)))
+cents = Table("cents_expense", metadata,
+              Column("user_id", Integer), Column("category_id", Integer), Column("amount_cents", BigInteger))
+
+def _timed(conn, stmt, repeat: int = 3):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = conn.execute(stmt).all()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+def main(rows: int = 1_000_000) -> None:
+    rng = random.Random(42)
+    data = [(rng.randint(1, 1000), rng.randint(1, 12), rng.randint(1, 500_000)) for _ in range(rows)]
+    exact = sum(c for _, _, c in data)
+
+    # the old User.balance path: a float adjusted once per write
+    balance = 0.0
+    for _, _, c in data:
+        balance -= float(Decimal(c) / 100)
+    balance_drift = abs(Decimal(repr(balance)) * 100 + exact)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{tmp}/bench.db")
+        metadata.create_all(engine)
+        with engine.begin() as conn:
+            conn.execute(legacy.insert(), [{"user_id": u, "category_id": k, "amount": Decimal(c) / 100} for u, k, c in data])
+            conn.execute(cents.insert(), [{"user_id": u, "category_id": k, "amount_cents": c} for u, k, c in data])
+
+        with engine.connect() as conn:
+            t_sum_legacy, (row,) = _timed(conn, select(func.sum(legacy.c.amount)))
+            drift_legacy = abs(Decimal(str(row[0])) * 100 - exact)
+            t_sum_cents, (row,) = _timed(conn, select(func.sum(cents.c.amount_cents)))
+            drift_cents = abs(row[0] - exact)
+
+            t_grp_legacy, grp_legacy = _timed(conn, select(legacy.c.user_id, func.sum(legacy.c.amount)).group_by(legacy.c.user_id))
+            t_grp_cents, grp_cents = _timed(conn, select(cents.c.user_id, func.sum(cents.c.amount_cents)).group_by(cents.c.user_id))
+            # what the API does with each row before answering
+            t0 = time.perf_counter(); [float(total) for _, total in grp_legacy]; conv_legacy = time.perf_counter() - t0
+            t0 = time.perf_counter(); [from_cents(total) for _, total in grp_cents]; conv_cents = time.perf_counter() - t0
+        engine.dispose()
+
+    print(f"rows: {rows}")
+    print(f"{'':18}{'numeric':>12}{'cents':>12}")
+    print(f"{'SUM (s)':18}{t_sum_legacy:>12.4f}{t_sum_cents:>12.4f}")
+    print(f"{'GROUP BY user (s)':18}{t_grp_legacy:>12.4f}{t_grp_cents:>12.4f}")
+    print(f"{'to JSON number (s)':18}{conv_legacy:>12.6f}{conv_cents:>12.6f}")
+    print(f"{'SUM drift (cents)':18}{str(drift_legacy):>12}{drift_cents:>12}")
+    print(f"{'balance drift (cents)':18}{str(balance_drift):>12}{0:>12}")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
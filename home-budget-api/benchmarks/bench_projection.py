@@ -0,0 +1,57 @@
+"""Bytes on the wire and server CPU for a large /expenses listing.
+
+Run from home-budget-api/:  python -m benchmarks.bench_projection [rows]
+Compares the full listing with ?fields=amount,created_at, each uncompressed,
+gzip and (if the brotli package is installed) br.
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+_tmp = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmp}/bench.db"
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+
+from fastapi.testclient import TestClient
+
+from app.compression import brotli
+from app.descriptions import intern_description
+from app.db import engine, SessionLocal
+from app.main import app
+from app.models import Expense, Category, User
+
+def main(rows: int = 50_000) -> None:
+    engine.echo = False
+    with TestClient(app) as client:
+        r = client.post("/auth/register", json={"email": "bench@example.com", "password": "secret123"})
+        headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+        db = SessionLocal()
+        categories = [c.id for c in db.query(Category).all()]
+        user_id = db.query(User.id).filter(User.email == "bench@example.com").scalar()
+        shops = [intern_description(db, f"shop {i}") for i in range(300)]
+        now = datetime.utcnow()
+        db.execute(Expense.__table__.insert(), [
+            {"user_id": user_id, "category_id": random.choice(categories), "description_id": shops[i % 300],
+             "amount_cents": random.randint(100, 50_000), "created_at": now - timedelta(minutes=i), "change_seq": 0}
+            for i in range(rows)
+        ])
+        db.commit()
+        db.close()
+
+        codings = ["identity", "gzip"] + (["br"] if brotli is not None else [])
+        print(f"rows: {rows}")
+        print(f"{'listing':<28}{'encoding':>10}{'bytes':>14}{'cpu_s':>10}")
+        for label, url in (("full", "/expenses"), ("fields=amount,created_at", "/expenses?fields=amount,created_at")):
+            for coding in codings:
+                t0 = time.process_time()
+                r = client.get(url, headers={**headers, "Accept-Encoding": coding})
+                cpu = time.process_time() - t0
+                assert r.status_code == 200
+                print(f"{label:<28}{coding:>10}{int(r.headers['content-length']):>14}{cpu:>10.3f}")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50_000)
@@ -0,0 +1,93 @@
+"""Load test: one user floods /analytics/summary while others do normal reads.
+
+Run from home-budget-api/:  python -m benchmarks.bench_ratelimit [seconds] [flood_threads]
+Runs the same scenario with the limiter off and on, and reports latency
+percentiles for the well-behaved users plus the flooder's 429 count.
+The server runs in its own process; give it a core of its own (2+ cores),
+otherwise the flood threads of the load generator starve it regardless.
+"""
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import httpx
+
+PORT = 8765
+BASE = f"http://127.0.0.1:{PORT}"
+CALM_USERS = 4
+
+def _register(client: httpx.Client, email: str) -> dict:
+    r = client.post("/auth/register", json={"email": email, "password": "secret123"})
+    if r.status_code == 400:
+        r = client.post("/auth/login", data={"username": email, "password": "secret123"})
+    return {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+def _scenario(seconds: float, flood_threads: int, enabled: bool) -> None:
+    stop = threading.Event()
+    calm_latencies, flood_codes = [], []
+
+    with httpx.Client(base_url=BASE) as setup:
+        flooder = _register(setup, "flooder@example.com")
+        calm = [_register(setup, f"calm{i}@example.com") for i in range(CALM_USERS)]
+        for headers in calm:
+            setup.post("/expenses", json={"description": "bench", "amount": 10}, headers=headers)
+
+    def flood():
+        with httpx.Client(base_url=BASE) as c:
+            while not stop.is_set():
+                flood_codes.append(c.get("/analytics/summary?period=this_year", headers=flooder).status_code)
+
+    def browse(headers):
+        with httpx.Client(base_url=BASE) as c:
+            while not stop.is_set():
+                t0 = time.perf_counter()
+                c.get("/expenses", headers=headers)
+                calm_latencies.append((time.perf_counter() - t0) * 1000)
+                time.sleep(0.05)
+
+    threads = [threading.Thread(target=flood) for _ in range(flood_threads)]
+    threads += [threading.Thread(target=browse, args=(h,)) for h in calm]
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+
+    q = statistics.quantiles(calm_latencies, n=100)
+    print(f"limiter={'on ' if enabled else 'off'}  calm p50={q[49]:7.1f} ms  p95={q[94]:7.1f} ms  "
+          f"calm requests={len(calm_latencies):5d}  flood requests={len(flood_codes):5d}  "
+          f"flood 429s={flood_codes.count(429):5d}")
+
+def _serve(tmp: str, enabled: bool) -> subprocess.Popen:
+    # the server gets its own process so the load generator does not compete for its GIL
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{tmp}/bench.db", RATE_LIMIT_ENABLED=str(enabled))
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(PORT), "--log-level", "warning"],
+        env=env, stdout=subprocess.DEVNULL,
+    )
+    for _ in range(100):
+        try:
+            httpx.get(f"{BASE}/health")
+            return server
+        except httpx.TransportError:
+            time.sleep(0.1)
+    server.kill()
+    raise RuntimeError("server did not start")
+
+def main(seconds: float = 5.0, flood_threads: int = 16) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        for enabled in (False, True):
+            server = _serve(tmp, enabled)
+            try:
+                _scenario(seconds, flood_threads, enabled)
+            finally:
+                server.terminate()
+                server.wait()
+
+if __name__ == "__main__":
+    main(float(sys.argv[1]) if len(sys.argv) > 1 else 5.0, int(sys.argv[2]) if len(sys.argv) > 2 else 16)
@@ -0,0 +1,35 @@
+"""Cold start benchmark: import time of app.main and time to first request.
+
+Run from home-budget-api/:  python -m benchmarks.bench_startup [runs]
+Each run is a fresh interpreter against a throwaway SQLite file, so the first
+run pays for create_all + seeding and the later ones hit the schema_version fast path.
+"""
+import os
+import subprocess
+import sys
+import tempfile
+
+CHILD = r"""
+import time
+t0 = time.perf_counter()
+import app.main
+t1 = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(app.main.app) as client:
+    assert client.get("/health").status_code == 200
+t2 = time.perf_counter()
+print(f"{t1 - t0:.4f} {t2 - t0:.4f}")
+"""
+
+def main(runs: int = 5) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{tmp}/bench.db")
+        print(f"{'run':>4} {'import_s':>10} {'first_request_s':>16}")
+        for i in range(runs):
+            out = subprocess.run(
+                [sys.executable, "-c", CHILD], env=env, capture_output=True, text=True, check=True
+            ).stdout.split()
+            print(f"{i + 1:>4} {float(out[-2]):>10.4f} {float(out[-1]):>16.4f}")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
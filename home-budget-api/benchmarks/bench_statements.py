@@ -0,0 +1,74 @@
+"""Statement job throughput vs per-user /analytics/summary.
+
+Run from home-budget-api/:  python -m benchmarks.bench_statements [users] [rows_per_user]
+The baseline calls the summary endpoint function once per user (seven queries each);
+the job is then run with 1, 2, 4, ... workers up to the CPU count.
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db import init_db
+from app.descriptions import intern_description
+from app.models import Category, Expense, Income, User
+from app.periods import period_range
+from app.routers.analytics import analytics_summary
+from app.statements import generate
+
+def main(users: int = 20_000, rows_per_user: int = 50) -> None:
+    rng = random.Random(3)
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{tmp}/bench.db"
+        engine = create_engine(url)
+        init_db(engine)
+        db = sessionmaker(bind=engine)()
+        db.add_all(Category(name=n) for n in ("food", "car", "utilities", "fun"))
+        db.add_all(User(id=i, email=f"u{i}@example.com", hashed_password="x", balance_cents=0)
+                   for i in range(1, users + 1))
+        db.flush()
+        categories = [c.id for c in db.query(Category).all()]
+        shops = [intern_description(db, f"shop {i}") for i in range(200)]
+        sources = [intern_description(db, s) for s in ("salary", "bonus", "gift")]
+        now = datetime.utcnow()
+        for first in range(1, users + 1, 1000):
+            ids = range(first, min(first + 1000, users + 1))
+            db.execute(Expense.__table__.insert(), [
+                {"user_id": u, "category_id": rng.choice(categories), "description_id": rng.choice(shops),
+                 "amount_cents": rng.randint(100, 20_000), "created_at": now - timedelta(days=rng.randint(0, 90)),
+                 "change_seq": 0}
+                for u in ids for _ in range(rows_per_user)
+            ])
+            db.execute(Income.__table__.insert(), [
+                {"user_id": u, "description_id": rng.choice(sources), "amount_cents": rng.randint(10_000, 500_000),
+                 "created_at": now - timedelta(days=rng.randint(0, 90)), "change_seq": 0}
+                for u in ids for _ in range(3)
+            ])
+        db.commit()
+
+        sample = min(users, 500)
+        t0 = time.perf_counter()
+        for uid in range(1, sample + 1):
+            analytics_summary(db=db, user=db.get(User, uid), period="last_month", date_from=None, date_to=None)
+        baseline = sample / (time.perf_counter() - t0)
+        db.close()
+        engine.dispose()
+
+        start, end, name = period_range("last_month", None, None)
+        print(f"users: {users}, expenses/user: {rows_per_user}")
+        print(f"{'mode':<28}{'users/s':>10}")
+        print(f"{'per-user summary':<28}{baseline:>10.0f}")
+        workers = 1
+        while workers <= (os.cpu_count() or 1):
+            t0 = time.perf_counter()
+            count = sum(1 for _ in generate(url, [url], start, end, name, workers))
+            print(f"{f'job, {workers} worker(s)':<28}{count / (time.perf_counter() - t0):>10.0f}")
+            workers *= 2
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:3]))
@@ -6,8 +6,10 @@ from sqlalchemy.pool import StaticPool
 
 from app.main import app
 from app.models import Base
-from app.auth.deps import get_db
+from app.auth.deps import get_db, get_directory_db
 from app.seed import _seed_categories_session
+from app.ratelimit import get_limiter
+from app import descriptions
 
 engine = create_engine(
     "sqlite://",
@@ -24,11 +26,14 @@ def override_get_db():
         db.close()
 
 app.dependency_overrides[get_db] = override_get_db
+app.dependency_overrides[get_directory_db] = override_get_db
 
 @pytest.fixture(autouse=True)
 def _reset_db():
     Base.metadata.drop_all(bind=engine)
     Base.metadata.create_all(bind=engine)
+    get_limiter().backend.reset()
+    descriptions.cache.clear()
     db = TestingSessionLocal()
     yield
     Base.metadata.drop_all(bind=engine)
@@ -36,3 +41,9 @@ def _reset_db():
 @pytest.fixture
 def client():
     return TestClient(app)
+
+def auth_headers(client, email: str = "user@example.com") -> dict:
+    """Register email and return its Bearer header."""
+    r = client.post("/auth/register", json={"email": email, "password": "secret123"})
+    assert r.status_code == 201, r.text
+    return {"Authorization": f"Bearer {r.json()['access_token']}"}
@@ -0,0 +1,46 @@
+import pytest
+
+from app.anomalies import rebuild_stats
+from app.models import SpendingStat
+from .conftest import TestingSessionLocal, auth_headers
+
+def stats(db):
+    return {s.category_id: (s.count, s.mean, s.m2) for s in db.query(SpendingStat).all()}
+
+def test_outlier_is_flagged_on_write_and_listed(client):
+    headers = auth_headers(client)
+    cat = client.post("/categories", json={"name": "food"}, headers=headers).json()["id"]
+
+    for amount in (10, 12, 11, 9, 10, 13):
+        e = client.post("/expenses", json={"description": "lunch", "amount": amount, "category_id": cat}, headers=headers).json()
+    assert e["is_anomaly"] is False
+
+    big = client.post("/expenses", json={"description": "banquet", "amount": 400, "category_id": cat}, headers=headers).json()
+    assert big["is_anomaly"] is True and big["anomaly_z"] > 3
+
+    # uncategorized history is tracked separately
+    other = client.post("/expenses", json={"description": "misc", "amount": 400}, headers=headers).json()
+    assert other["anomaly_z"] is None
+
+    listed = client.get("/analytics/anomalies", headers=headers).json()
+    assert [x["id"] for x in listed] == [big["id"]]
+
+def test_incremental_stats_match_rebuild(client):
+    headers = auth_headers(client)
+    cat = client.post("/categories", json={"name": "car"}, headers=headers).json()["id"]
+    ids = [client.post("/expenses", json={"description": "fuel", "amount": a, "category_id": cat}, headers=headers).json()["id"]
+           for a in (30, 45.5, 52, 38)]
+    client.put(f"/expenses/{ids[1]}", json={"description": "fuel", "amount": 41, "category_id": None}, headers=headers)
+    client.delete(f"/expenses/{ids[2]}", headers=headers)
+
+    db = TestingSessionLocal()
+    incremental = stats(db)
+    rebuild_stats(db)
+    rebuilt = stats(db)
+    db.close()
+
+    assert incremental.keys() == rebuilt.keys()
+    for key, (n, mean, m2) in rebuilt.items():
+        assert incremental[key][0] == n
+        assert incremental[key][1] == pytest.approx(mean)
+        assert incremental[key][2] == pytest.approx(m2, abs=1e-6)
@@ -0,0 +1,78 @@
+from datetime import datetime, timedelta
+
+from app.archive import archive_old_rows
+from app.models import Expense, ExpenseArchive, Income, SpendingStat
+from .conftest import TestingSessionLocal, auth_headers
+
+def test_archived_rows_are_read_only_when_range_needs_them(client):
+    headers = auth_headers(client)
+    old = client.post("/expenses", json={"description": "old rent", "amount": 100}, headers=headers).json()
+    client.post("/expenses", json={"description": "pizza", "amount": 20}, headers=headers)
+    client.post("/incomes", json={"description": "old salary", "amount": 500}, headers=headers)
+
+    db = TestingSessionLocal()
+    two_years_ago = datetime.utcnow() - timedelta(days=730)
+    db.get(Expense, old["id"]).created_at = two_years_ago
+    db.query(Income).update({Income.created_at: two_years_ago})
+    db.commit()
+
+    moved = archive_old_rows(db, datetime.utcnow() - timedelta(days=365))
+    assert moved == {"expense": 1, "income": 1}
+    assert db.query(ExpenseArchive).count() == 1
+    db.close()
+
+    recent_from = (datetime.utcnow() - timedelta(days=30)).isoformat()
+    recent = client.get(f"/expenses?date_from={recent_from}", headers=headers).json()
+    assert [e["description"] for e in recent] == ["pizza"]
+
+    everything = client.get("/expenses", headers=headers).json()
+    assert [e["description"] for e in everything] == ["pizza", "old rent"]
+    assert len(client.get("/incomes", headers=headers).json()) == 1
+
+    data = client.get("/analytics/summary?period=this_year", headers=headers).json()
+    assert data["account"]["lifetime_spent"] == 120.0
+    assert data["account"]["lifetime_earned"] == 500.0
+
+    frm = (datetime.utcnow() - timedelta(days=800)).date().isoformat()
+    to = datetime.utcnow().date().isoformat()
+    data = client.get(f"/analytics/summary?date_from={frm}&date_to={to}", headers=headers).json()
+    assert data["totals"]["spent"] == 120.0
+    assert data["by_source"] == [{"source": "old salary", "total": 500.0}]
+
+def test_archived_rows_can_be_read_updated_and_deleted(client):
+    headers = auth_headers(client)
+    food = client.post("/categories", json={"name": "food"}, headers=headers).json()["id"]
+    rows = [client.post("/expenses", json={"description": f"old {i}", "amount": 10, "category_id": food},
+                        headers=headers).json() for i in range(3)]
+    client.post("/expenses", json={"description": "new", "amount": 5}, headers=headers)
+    start = client.get("/analytics/summary?period=this_month", headers=headers).json()["account"]["current_balance"]
+
+    db = TestingSessionLocal()
+    for i, row in enumerate(rows):
+        db.get(Expense, row["id"]).created_at = datetime.utcnow() - timedelta(days=700 + i)
+    db.commit()
+    archive_old_rows(db, datetime.utcnow() - timedelta(days=365))
+    db.close()
+
+    kept, edited, dropped = (r["id"] for r in rows)
+    assert client.get(f"/expenses/{kept}", headers=headers).json()["description"] == "old 0"
+    r = client.put(f"/expenses/{edited}", json={"description": "edited", "amount": 25, "category_id": food}, headers=headers)
+    assert r.status_code == 200 and r.json()["id"] == edited
+    assert client.delete(f"/expenses/{dropped}", headers=headers).status_code == 204
+    assert client.get(f"/expenses/{dropped}", headers=headers).status_code == 404
+
+    listed = client.get("/expenses", headers=headers).json()
+    assert [e["description"] for e in listed] == ["new", "old 0", "edited"]
+    assert [e["description"] for e in client.get("/expenses?fields=description", headers=headers).json()] \
+        == ["new", "old 0", "edited"]
+    balance = client.get("/analytics/summary?period=this_month", headers=headers).json()["account"]["current_balance"]
+    assert balance == start - 15 + 10
+
+    db = TestingSessionLocal()
+    stat = db.query(SpendingStat).filter(SpendingStat.category_id == food).one()
+    assert (stat.count, stat.mean) == (2, 1750.0)
+    db.close()
+
+    sync = client.post("/sync", json={"operations": [{"op": "delete", "entity": "expense", "id": kept}]}, headers=headers)
+    assert sync.status_code == 200
+    assert [e["description"] for e in client.get("/expenses", headers=headers).json()] == ["new", "edited"]
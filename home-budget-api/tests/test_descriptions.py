@@ -0,0 +1,99 @@
+from sqlalchemy import create_engine, inspect
+
+from app import descriptions
+from app.db import init_db
+from app.descriptions import describe, intern_description
+from app.models import Description, Income, SchemaVersion
+from .conftest import TestingSessionLocal, auth_headers
+
+def test_descriptions_are_interned_and_grouped_by_id(client):
+    headers = auth_headers(client, "intern@example.com")
+    for description, amount in (("salary", 1000), ("salary", 1000), ("gift", 50)):
+        client.post("/incomes", json={"description": description, "amount": amount}, headers=headers)
+    for description, amount in (("Lidl", 20), ("Lidl", 30), ("Konzum", 10), ("salary", 5)):
+        client.post("/expenses", json={"description": description, "amount": amount}, headers=headers)
+
+    db = TestingSessionLocal()
+    assert sorted(d.text for d in db.query(Description).all()) == ["Konzum", "Lidl", "gift", "salary"]
+    db.close()
+
+    summary = client.get("/analytics/summary?period=this_month", headers=headers).json()
+    assert summary["by_source"] == [{"source": "salary", "total": 2000.0}, {"source": "gift", "total": 50.0}]
+    top = client.get("/analytics/top-merchants?period=this_month&limit=2", headers=headers).json()
+    assert top["merchants"] == [{"merchant": "Lidl", "count": 2, "total": 50.0},
+                                {"merchant": "Konzum", "count": 1, "total": 10.0}]
+    listed = client.get("/expenses?fields=description,amount", headers=headers).json()
+    assert {e["description"] for e in listed} == {"Lidl", "Konzum", "salary"}
+
+def test_cache_only_holds_committed_ids():
+    db = TestingSessionLocal()
+    intern_description(db, "tram")
+    assert len(descriptions.cache) == 0
+    db.rollback()
+    assert len(descriptions.cache) == 0
+
+    committed = intern_description(db, "tram")
+    assert intern_description(db, "tram") == committed
+    db.commit()
+    assert descriptions.cache.get((db.get_bind(), "tram")) == (committed, "tram")
+    assert db.query(Description).count() == 1
+    db.close()
+
+def test_migration_moves_text_into_the_dictionary(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/v7.db")
+    init_db(engine)
+    with engine.begin() as conn:
+        # income as it looked before interning
+        conn.exec_driver_sql("DROP TABLE income")
+        conn.exec_driver_sql(
+            "CREATE TABLE income (id INTEGER PRIMARY KEY, user_id INTEGER, description VARCHAR(255), "
+            "amount_cents BIGINT, created_at DATETIME, updated_at DATETIME, change_seq BIGINT)"
+        )
+        conn.exec_driver_sql(
+            "INSERT INTO income (user_id, description, amount_cents, change_seq) "
+            "VALUES (1, 'salary', 100000, 0), (1, 'salary', 100000, 0), (1, 'bonus', 5000, 0)"
+        )
+        conn.execute(SchemaVersion.__table__.update().values(version=7))
+
+    assert init_db(engine) is True
+    assert "description" not in {c["name"] for c in inspect(engine).get_columns("income")}
+    db = TestingSessionLocal(bind=engine)
+    assert sorted(i.description for i in db.query(Income).all()) == ["bonus", "salary", "salary"]
+    assert db.query(Description).count() == 2
+    assert describe(db, "salary").id == db.query(Income).first().description_id
+    db.close()
+    engine.dispose()
+
+def test_spacing_and_case_variants_share_one_row(client):
+    headers = auth_headers(client, "variants@example.com")
+    for description in ("Lidl", "lidl ", "  LIDL", "Lidl  Plus"):
+        client.post("/expenses", json={"description": description, "amount": 10}, headers=headers)
+
+    db = TestingSessionLocal()
+    assert sorted(d.text for d in db.query(Description).all()) == ["Lidl", "Lidl Plus"]
+    db.close()
+    top = client.get("/analytics/top-merchants?period=this_month", headers=headers).json()
+    assert top["merchants"][0] == {"merchant": "Lidl", "count": 3, "total": 30.0}
+    assert {e["description"] for e in client.get("/expenses", headers=headers).json()} == {"Lidl", "Lidl Plus"}
+
+def test_migration_merges_variant_descriptions(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/v11.db")
+    init_db(engine)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("DROP INDEX ix_description_key")
+        conn.execute(Description.__table__.insert(), [
+            {"id": 1, "text": "Lidl ", "key": "Lidl "}, {"id": 2, "text": "LIDL", "key": "LIDL"},
+            {"id": 3, "text": "Konzum", "key": "Konzum"},
+        ])
+        conn.execute(Income.__table__.insert(), [
+            {"user_id": 1, "description_id": d, "amount_cents": 100, "change_seq": 0} for d in (1, 2, 3)
+        ])
+        conn.execute(SchemaVersion.__table__.update().values(version=11))
+
+    assert init_db(engine) is True
+    db = TestingSessionLocal(bind=engine)
+    assert sorted((d.id, d.text, d.key) for d in db.query(Description).all()) == [(1, "Lidl", "lidl"), (3, "Konzum", "konzum")]
+    assert sorted(i.description_id for i in db.query(Income).all()) == [1, 1, 3]
+    assert describe(db, "lidl").id == 1
+    db.close()
+    engine.dispose()
@@ -0,0 +1,80 @@
+from datetime import datetime, timedelta, UTC
+
+from app.descriptions import describe
+from app.idempotency import Idempotency, sweep_expired
+from app.models import Expense, IdempotencyKey, User
+from .conftest import TestingSessionLocal, auth_headers
+
+def balance(client, headers):
+    return client.get("/analytics/summary?period=this_month", headers=headers).json()["account"]["current_balance"]
+
+def test_retried_writes_are_applied_once(client):
+    headers = auth_headers(client, "retry@example.com")
+    start = balance(client, headers)
+    keyed = {**headers, "Idempotency-Key": "create-1"}
+
+    first = client.post("/expenses", json={"description": "coffee", "amount": 3.5}, headers=keyed)
+    again = client.post("/expenses", json={"description": "coffee", "amount": 3.5}, headers=keyed)
+    assert first.status_code == again.status_code == 201
+    assert again.content == first.content
+    assert again.headers["Idempotent-Replayed"] == "true"
+    assert len(client.get("/expenses", headers=headers).json()) == 1
+    assert balance(client, headers) == start - 3.5
+
+    reused = client.post("/expenses", json={"description": "tea", "amount": 2}, headers=keyed)
+    assert reused.status_code == 422
+
+    income = {**headers, "Idempotency-Key": "income-1"}
+    for _ in range(2):
+        r = client.post("/incomes", json={"description": "salary", "amount": 100}, headers=income)
+        assert r.status_code == 201
+    expense_id = first.json()["id"]
+    delete = {**headers, "Idempotency-Key": "delete-1"}
+    for _ in range(2):
+        assert client.delete(f"/expenses/{expense_id}", headers=delete).status_code == 204
+    assert balance(client, headers) == start + 100
+
+def test_keys_are_scoped_per_user(client):
+    a = auth_headers(client, "a@example.com")
+    b = auth_headers(client, "b@example.com")
+    for headers in (a, b):
+        r = client.post("/incomes", json={"description": "gift", "amount": 10}, headers={**headers, "Idempotency-Key": "k"})
+        assert r.status_code == 201
+        assert "Idempotent-Replayed" not in r.headers
+        assert len(client.get("/incomes", headers=headers).json()) == 1
+
+def test_expired_keys_are_swept_and_can_be_reused(client):
+    headers = auth_headers(client, "ttl@example.com")
+    keyed = {**headers, "Idempotency-Key": "old"}
+    client.post("/expenses", json={"description": "book", "amount": 20}, headers=keyed)
+
+    db = TestingSessionLocal()
+    db.query(IdempotencyKey).update({"expires_at": datetime.now(UTC) - timedelta(seconds=1)})
+    db.commit()
+    r = client.post("/expenses", json={"description": "book", "amount": 20}, headers=keyed)
+    assert r.status_code == 201 and "Idempotent-Replayed" not in r.headers
+    assert db.query(Expense).count() == 2
+
+    assert sweep_expired(db, now=datetime.now(UTC) + timedelta(days=2)) == 1
+    assert db.query(IdempotencyKey).count() == 0
+    db.close()
+
+def test_concurrent_duplicate_replays_the_winner(client):
+    auth_headers(client, "race@example.com")
+    db = TestingSessionLocal()
+    user = db.query(User).one()
+    idem = Idempotency(db, user.id, "race", "same-request")
+    assert idem.replay() is None
+
+    # the other request commits first
+    other = TestingSessionLocal()
+    other.add(IdempotencyKey(user_id=user.id, key="race", fingerprint="same-request", status_code=201,
+                             body=b'{"id":1}', expires_at=datetime.now(UTC) + timedelta(hours=1)))
+    other.commit()
+    other.close()
+
+    db.add(Expense(user_id=user.id, description_ref=describe(db, "dup"), amount_cents=100))
+    r = idem.commit(201, lambda: {"id": 2})
+    assert r.body == b'{"id":1}' and r.headers["Idempotent-Replayed"] == "true"
+    assert db.query(Expense).count() == 0
+    db.close()
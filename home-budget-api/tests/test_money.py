@@ -0,0 +1,38 @@
+from app.money import to_cents, from_cents
+
+def test_cent_conversion_rounds_half_up():
+    assert to_cents(0.1) == 10
+    assert to_cents("19.995") == 2000
+    assert to_cents(1234567.89) == 123456789
+    assert from_cents(1999) == 19.99
+
+def test_amounts_do_not_drift(client):
+    r = client.post("/auth/register", json={"email": "cents@example.com", "password": "secret123"})
+    headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+    for _ in range(10):
+        client.post("/expenses", json={"description": "coffee", "amount": 0.1}, headers=headers)
+    client.post("/incomes", json={"description": "refund", "amount": 0.2}, headers=headers)
+
+    data = client.get("/analytics/summary?period=this_month", headers=headers).json()
+    assert data["totals"]["spent"] == 1.0
+    assert data["totals"]["net"] == -0.8
+    assert data["account"]["current_balance"] == 999.2
+    assert data["account"]["initial_estimate"] == 1000.0
+
+    cheap = client.get("/expenses?amount_max=0.1", headers=headers).json()
+    assert len(cheap) == 10 and cheap[0]["amount"] == 0.1
+
+def test_amounts_that_round_to_zero_are_rejected(client):
+    r = client.post("/auth/register", json={"email": "dust@example.com", "password": "secret123"})
+    headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+    assert client.post("/expenses", json={"description": "dust", "amount": 0.004}, headers=headers).status_code == 400
+    assert client.post("/incomes", json={"description": "dust", "amount": 0.004}, headers=headers).status_code == 400
+    e = client.post("/expenses", json={"description": "coffee", "amount": 2}, headers=headers).json()
+    assert client.put(f"/expenses/{e['id']}", json={"description": "coffee", "amount": 0.004},
+                      headers=headers).status_code == 400
+    r = client.post("/sync", json={"operations": [{"op": "create", "entity": "income", "description": "dust",
+                                                   "amount": 0.004}]}, headers=headers)
+    assert r.status_code == 400
+    assert client.get("/analytics/summary?period=this_month", headers=headers).json()["account"]["current_balance"] == 998.0
@@ -0,0 +1,37 @@
+from .conftest import auth_headers
+
+def test_fields_narrow_the_listing(client):
+    headers = auth_headers(client)
+    cat = client.post("/categories", json={"name": "food"}, headers=headers).json()["id"]
+    client.post("/expenses", json={"description": "pizza", "amount": 12.5, "category_id": cat}, headers=headers)
+    client.post("/incomes", json={"description": "salary", "amount": 100}, headers=headers)
+
+    full = client.get("/expenses", headers=headers).json()[0]
+    slim = client.get("/expenses?fields=amount,created_at", headers=headers).json()
+    assert slim == [{"amount": 12.5, "created_at": full["created_at"]}]
+
+    with_cat = client.get("/expenses?fields=id,category", headers=headers).json()
+    assert with_cat == [{"id": full["id"], "category": {"name": "food", "id": cat}}]
+
+    assert client.get("/incomes?fields=description", headers=headers).json() == [{"description": "salary"}]
+    assert client.get("/incomes?fields=category", headers=headers).status_code == 400
+
+def test_large_responses_are_gzipped(client):
+    headers = auth_headers(client)
+    for i in range(30):
+        client.post("/expenses", json={"description": f"item {i}", "amount": 1}, headers=headers)
+
+    r = client.get("/expenses", headers={**headers, "Accept-Encoding": "gzip"})
+    assert r.headers["content-encoding"] == "gzip"
+    assert len(r.json()) == 30
+
+    small = client.get("/health", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in small.headers
+
+def test_no_content_responses_pass_through_compression(client):
+    headers = {**auth_headers(client), "Accept-Encoding": "gzip"}
+    e = client.post("/expenses", json={"description": "coffee", "amount": 1}, headers=headers).json()
+
+    r = client.delete(f"/expenses/{e['id']}", headers=headers)
+    assert r.status_code == 204
+    assert "content-length" not in r.headers and "content-encoding" not in r.headers
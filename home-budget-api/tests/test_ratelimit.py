@@ -0,0 +1,69 @@
+import asyncio
+import os
+import subprocess
+import sys
+
+import pytest
+
+from app.ratelimit import get_limiter, MemoryBackend, SQLiteBackend
+from .conftest import auth_headers
+
+@pytest.fixture
+def tight_limiter(monkeypatch):
+    limiter = get_limiter()
+    monkeypatch.setattr(limiter, "capacity", 10.0)
+    monkeypatch.setattr(limiter, "refill_per_second", 0.01)
+    monkeypatch.setattr(limiter, "costs", {"/analytics": 7.0})
+    return limiter
+
+def test_flooding_user_gets_429_without_affecting_others(client, tight_limiter):
+    flooder = auth_headers(client, "flood@example.com")
+    other = auth_headers(client, "calm@example.com")
+
+    assert client.get("/analytics/summary", headers=flooder).status_code == 200
+    r = client.get("/analytics/summary", headers=flooder)
+    assert r.status_code == 429
+    assert int(r.headers["Retry-After"]) >= 1
+
+    assert client.get("/expenses", headers=flooder).status_code == 200
+    assert client.get("/analytics/summary", headers=other).status_code == 200
+
+def test_sqlite_backend_shares_state_between_instances(tmp_path):
+    path = str(tmp_path / "buckets.db")
+    a, b = SQLiteBackend(path), SQLiteBackend(path)
+    assert a.take("user:1", 3, 5, 0.001, 100.0) == (True, 0.0)
+    allowed, retry_after = b.take("user:1", 3, 5, 0.001, 100.0)
+    assert not allowed and retry_after > 0
+    assert MemoryBackend().take("user:1", 3, 5, 0.001, 100.0)[0]
+
+def test_token_is_decoded_once_per_request(client, monkeypatch):
+    from app.auth import deps
+    headers = auth_headers(client, "once@example.com")
+    calls = []
+    real = deps.decode_token
+    monkeypatch.setattr(deps, "decode_token", lambda token: calls.append(token) or real(token))
+
+    assert client.post("/expenses", json={"description": "x", "amount": 1}, headers=headers).status_code == 201
+    assert len(calls) == 1
+    assert client.get("/expenses", headers={"Authorization": "Bearer junk"}).status_code == 401
+
+def test_file_backend_runs_off_the_event_loop(client, monkeypatch):
+    loops = []
+
+    class Recording:
+        def take(self, key, cost, capacity, rate, now):
+            try:
+                loops.append(asyncio.get_running_loop())
+            except RuntimeError:
+                loops.append(None)
+            return True, 0.0
+
+    monkeypatch.setattr(get_limiter(), "backend", Recording())
+    assert client.get("/health").status_code == 200
+    assert loops == [None]
+
+def test_importing_the_app_creates_no_bucket_file(tmp_path):
+    path = tmp_path / "buckets.db"
+    env = dict(os.environ, RATE_LIMIT_BACKEND="sqlite", RATE_LIMIT_SQLITE_PATH=str(path))
+    subprocess.run([sys.executable, "-c", "import app.main"], env=env, check=True)
+    assert not path.exists()
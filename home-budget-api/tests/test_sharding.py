@@ -0,0 +1,246 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+
+from app import sharding
+from app.config import settings
+from app.anomalies import rebuild_all
+from app.descriptions import describe
+from app.archive import archive_horizon, archive_old_rows
+from app.auth.deps import get_db, get_directory_db
+from app.main import app
+from app.models import Category, Expense, ExpenseArchive, SpendingStat, User, UserShard
+from app.seed import _seed_categories_session
+from .conftest import auth_headers
+
+@pytest.fixture
+def shards(tmp_path, monkeypatch):
+    directory = create_engine(f"sqlite:///{tmp_path}/directory.db")
+    engines = [create_engine(f"sqlite:///{tmp_path}/shard{i}.db") for i in range(3)]
+    shard_map = sharding.ShardMap(directory, engines)
+    shard_map.init_all()
+    with shard_map.Directory() as d:
+        _seed_categories_session(d, ["food", "car"])
+    sharding.sync_categories(shard_map)
+
+    monkeypatch.setattr(sharding, "shard_map", shard_map)
+    monkeypatch.delitem(app.dependency_overrides, get_db)
+    monkeypatch.delitem(app.dependency_overrides, get_directory_db)
+    yield shard_map
+    for engine in [directory, *engines]:
+        engine.dispose()
+
+def rows(shard_map, shard, model):
+    with shard_map.session(shard) as s:
+        return s.query(model).all()
+
+def test_users_are_routed_to_their_shard(client, shards):
+    users = {f"u{i}@example.com": auth_headers(client, f"u{i}@example.com") for i in range(12)}
+    with shards.Directory() as d:
+        placement = {p.user_id: p.shard for p in d.query(UserShard).all()}
+    assert len(set(placement.values())) > 1
+
+    for headers in users.values():
+        food = client.get("/categories", headers=headers).json()[0]["id"]
+        r = client.post("/expenses", json={"description": "x", "amount": 1, "category_id": food}, headers=headers)
+        assert r.status_code == 201, r.text
+
+    for shard in range(3):
+        owners = {e.user_id for e in rows(shards, shard, Expense)}
+        assert owners == {uid for uid, s in placement.items() if s == shard}
+
+def test_categories_are_replicated(client, shards):
+    headers = auth_headers(client, "cat@example.com")
+    created = client.post("/categories", json={"name": "travel"}, headers=headers).json()
+    for shard in range(3):
+        assert created["id"] in {c.id for c in rows(shards, shard, Category)}
+
+    client.delete(f"/categories/{created['id']}", headers=headers)
+    for shard in range(3):
+        assert created["id"] not in {c.id for c in rows(shards, shard, Category)}
+
+def test_move_user_keeps_data_and_sync_consistent(client, shards):
+    headers = auth_headers(client, "mover@example.com")
+    kept = client.post("/expenses", json={"description": "rent", "amount": 300},
+                       headers={**headers, "Idempotency-Key": "rent-1"}).json()
+    cursor = client.get("/sync", headers=headers).json()["cursor"]
+    client.post("/incomes", json={"description": "salary", "amount": 1000}, headers=headers)
+
+    with shards.Directory() as d:
+        user = d.query(User).filter(User.email == "mover@example.com").one()
+        src = d.get(UserShard, user.id).shard
+    assert kept["id"] // settings.SHARD_ID_SPAN == src
+    dst = (src + 1) % 3
+    assert sharding.move_user(shards, user.id, dst)
+
+    assert rows(shards, src, Expense) == []
+    assert client.get(f"/expenses/{kept['id']}", headers=headers).json()["description"] == "rent"
+    retried = client.post("/expenses", json={"description": "rent", "amount": 300},
+                          headers={**headers, "Idempotency-Key": "rent-1"})
+    assert retried.json() == kept
+
+    # nothing changed for the client: same ids, same sequence numbers
+    delta = client.get(f"/sync?since={cursor}", headers=headers).json()
+    assert delta["deleted"]["expenses"] == []
+    assert delta["changes"]["expenses"] == []
+    assert [i["description"] for i in delta["changes"]["incomes"]] == ["salary"]
+
+    summary = client.get("/analytics/summary?period=this_month", headers=headers).json()
+    assert summary["account"]["current_balance"] == 1000.0 - 300 + 1000
+
+def test_stats_rebuild_covers_every_shard(client, shards):
+    users = [auth_headers(client, f"stats{i}@example.com") for i in range(8)]
+    for headers in users:
+        client.post("/expenses", json={"description": "x", "amount": 5}, headers=headers)
+    for shard in range(3):
+        with shards.session(shard) as s:
+            s.query(SpendingStat).delete()
+            s.commit()
+
+    assert rebuild_all(shards) == len(users)
+    assert sum(len(rows(shards, shard, SpendingStat)) for shard in range(3)) == len(users)
+
+def test_move_user_keeps_archived_rows_archived(client, shards):
+    headers = auth_headers(client, "archived@example.com")
+    old = client.post("/expenses", json={"description": "old rent", "amount": 100}, headers=headers).json()
+    client.post("/expenses", json={"description": "pizza", "amount": 20}, headers=headers)
+    with shards.Directory() as d:
+        user = d.query(User).filter(User.email == "archived@example.com").one()
+        src = d.get(UserShard, user.id).shard
+    with shards.session(src) as s:
+        s.get(Expense, old["id"]).created_at = datetime.utcnow() - timedelta(days=730)
+        s.commit()
+        archive_old_rows(s, datetime.utcnow() - timedelta(days=365))
+    cursor = client.get("/sync", headers=headers).json()["cursor"]
+
+    dst = (src + 1) % 3
+    assert sharding.move_user(shards, user.id, dst)
+
+    assert [e.description for e in rows(shards, dst, Expense)] == ["pizza"]
+    archived = rows(shards, dst, ExpenseArchive)
+    assert [e.description for e in archived] == ["old rent"]
+    with shards.session(dst) as d:
+        assert archive_horizon(d) is not None
+
+    listed = client.get("/expenses", headers=headers).json()
+    assert [e["description"] for e in listed] == ["pizza", "old rent"]
+    assert archived[0].id == old["id"]
+    assert client.get(f"/expenses/{old['id']}", headers=headers).json()["description"] == "old rent"
+
+    delta = client.get(f"/sync?since={cursor}", headers=headers).json()
+    assert delta["deleted"]["expenses"] == [] and delta["changes"]["expenses"] == []
+
+def test_failed_shard_write_leaves_no_account(client, shards, monkeypatch):
+    real = sharding._copy_user_row
+    def broken(user):
+        raise RuntimeError("shard down")
+
+    monkeypatch.setattr(sharding, "_copy_user_row", broken)
+    with pytest.raises(RuntimeError):
+        for i in range(6):  # at least one lands on a replica shard
+            client.post("/auth/register", json={"email": f"lost{i}@example.com", "password": "secret123"})
+    monkeypatch.setattr(sharding, "_copy_user_row", real)
+
+    with shards.Directory() as d:
+        registered = {u.email for u in d.query(User).all()}
+    assert f"lost{i}@example.com" not in registered
+    headers = auth_headers(client, f"lost{i}@example.com")
+    assert client.get("/expenses", headers=headers).status_code == 200
+
+def test_balance_lives_only_on_the_shard(client, shards):
+    users = {f"bal{i}@example.com": auth_headers(client, f"bal{i}@example.com") for i in range(6)}
+    for headers in users.values():
+        client.post("/expenses", json={"description": "x", "amount": 10}, headers=headers)
+
+    with shards.Directory() as d:
+        placed = {u.email: (u.id, u.balance_cents, d.get(UserShard, u.id).shard) for u in d.query(User).all()}
+    for uid, directory_balance, shard in placed.values():
+        with shards.session(shard) as s:
+            assert s.get(User, uid).balance_cents == 99000
+        assert directory_balance == (0 if shard in shards.replicas() else 99000)
+
+def test_placements_are_cached_and_recover_after_a_move_elsewhere(client, shards, monkeypatch):
+    headers = auth_headers(client, "cached@example.com")
+    assert client.get("/expenses", headers=headers).status_code == 200
+    with shards.Directory() as d:
+        user = d.query(User).filter(User.email == "cached@example.com").one()
+        src = d.get(UserShard, user.id).shard
+
+    lookups = []
+    real = shards.Directory
+    monkeypatch.setattr(shards, "Directory", lambda: lookups.append(1) or real())
+    assert client.get("/expenses", headers=headers).status_code == 200
+    assert lookups == []
+
+    # the rebalance CLI runs in another process with its own ShardMap
+    assert sharding.move_user(sharding.ShardMap(shards.directory_engine, shards.engines), user.id, (src + 1) % 3)
+    r = client.get("/expenses", headers=headers)
+    assert r.status_code == 503 and r.headers["Retry-After"] == "1"
+    assert client.get("/expenses", headers=headers).status_code == 200
+
+def test_move_blocks_the_user_and_recopies_late_writes(client, shards, monkeypatch):
+    headers = auth_headers(client, "busy@example.com")
+    client.post("/expenses", json={"description": "rent", "amount": 300}, headers=headers)
+    with shards.Directory() as d:
+        user = d.query(User).filter(User.email == "busy@example.com").one()
+        src = d.get(UserShard, user.id).shard
+
+    during, real = [], sharding._copy_user
+    def copy_then_write(shards_, s, d, user_id, dst):
+        real(shards_, s, d, user_id, dst)
+        if not during:
+            during.append(client.get("/expenses", headers=headers).status_code)
+            # a write that was already past authentication when the flag went up
+            with shards.session(src) as w:
+                w.add(Expense(user_id=user_id, description_ref=describe(w, "late"), amount_cents=500))
+                w.commit()
+
+    monkeypatch.setattr(sharding, "_copy_user", copy_then_write)
+    assert sharding.move_user(shards, user.id, (src + 1) % 3)
+    assert during == [503]
+    assert sorted(e["description"] for e in client.get("/expenses", headers=headers).json()) == ["late", "rent"]
+
+def test_failed_move_unblocks_the_user(client, shards, monkeypatch):
+    headers = auth_headers(client, "stuck@example.com")
+    with shards.Directory() as d:
+        user = d.query(User).filter(User.email == "stuck@example.com").one()
+        src = d.get(UserShard, user.id).shard
+    def broken(*args):
+        raise RuntimeError("destination down")
+
+    monkeypatch.setattr(sharding, "_copy_user", broken)
+    with pytest.raises(RuntimeError):
+        sharding.move_user(shards, user.id, (src + 1) % 3)
+    assert shards.shard_for(user.id) == src
+    assert client.get("/expenses", headers=headers).status_code == 200
+
+def test_move_refuses_ids_already_used_on_the_destination(client, shards):
+    headers = auth_headers(client, "legacy@example.com")
+    e = client.post("/expenses", json={"description": "rent", "amount": 300}, headers=headers).json()
+    with shards.Directory() as d:
+        user = d.query(User).filter(User.email == "legacy@example.com").one()
+        src = d.get(UserShard, user.id).shard
+    dst = (src + 1) % 3
+    with shards.session(dst) as s:
+        s.merge(User(id=999, email="other@example.com", hashed_password="x", balance_cents=0))
+        s.add(Expense(id=e["id"], user_id=999, description_ref=describe(s, "old"), amount_cents=1))
+        s.commit()
+
+    with pytest.raises(RuntimeError, match="already exist"):
+        sharding.move_user(shards, user.id, dst)
+    assert client.get(f"/expenses/{e['id']}", headers=headers).status_code == 200
+
+def test_each_shard_issues_ids_from_its_own_range(shards):
+    for shard in range(3):
+        with shards.session(shard) as s:
+            s.merge(User(id=1, email="range@example.com", hashed_password="x", balance_cents=0))
+            row = Expense(user_id=1, description_ref=describe(s, "x"), amount_cents=1)
+            s.add(row)
+            s.commit()
+            assert row.id == shard * settings.SHARD_ID_SPAN + 1
+    shards.init_all()  # idempotent
+    with shards.session(2) as s:
+        s.add(row := Expense(user_id=1, description_ref=describe(s, "y"), amount_cents=1))
+        s.commit()
+        assert row.id == 2 * settings.SHARD_ID_SPAN + 2
@@ -0,0 +1,64 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, inspect, select
+from sqlalchemy.exc import IntegrityError
+
+from app.db import init_db, SCHEMA_VERSION
+from app.models import Category, Expense, SchemaVersion, SpendingStat, User
+from app.seed import _seed_categories_session, DEFAULT_CATEGORIES
+from .conftest import TestingSessionLocal
+
+def test_seed_is_idempotent_and_case_insensitive():
+    db = TestingSessionLocal()
+    db.add(Category(name="Food"))
+    db.commit()
+
+    created = _seed_categories_session(db, DEFAULT_CATEGORIES)
+    assert created == len(DEFAULT_CATEGORIES) - 1
+    assert _seed_categories_session(db, DEFAULT_CATEGORIES) == 0
+
+    names = sorted(c.name.lower() for c in db.query(Category).all())
+    assert names == sorted(DEFAULT_CATEGORIES)
+    db.close()
+
+def test_init_db_skips_when_schema_version_matches(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/startup.db")
+    assert init_db(engine) is True
+    assert "expense" in inspect(engine).get_table_names()
+    assert init_db(engine) is False
+    engine.dispose()
+
+def test_init_db_leaves_a_newer_schema_alone(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/newer.db")
+    init_db(engine)
+    with engine.begin() as conn:
+        conn.execute(SchemaVersion.__table__.update().values(version=SCHEMA_VERSION + 1))
+    assert init_db(engine) is False
+    with engine.connect() as conn:
+        assert conn.execute(select(SchemaVersion.version)).scalar() == SCHEMA_VERSION + 1
+    engine.dispose()
+
+def test_migrations_rebuild_stats_and_dedupe_uncategorized_rows(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/stats.db")
+    init_db(engine)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("DROP INDEX uq_spending_stat_uncategorized")
+        conn.execute(SchemaVersion.__table__.update().values(version=4))
+        conn.execute(User.__table__.insert().values(id=1, email="old@example.com", hashed_password="x", balance_cents=0))
+        conn.execute(Expense.__table__.insert(), [
+            {"user_id": 1, "description_id": 0, "amount_cents": a, "created_at": datetime(2024, 1, 1), "change_seq": 0}
+            for a in (100, 300)
+        ])
+        conn.execute(SpendingStat.__table__.insert(), [
+            {"user_id": 1, "category_id": None, "count": 1, "mean": 100.0, "m2": 0.0},
+            {"user_id": 1, "category_id": None, "count": 1, "mean": 300.0, "m2": 0.0},
+        ])
+    assert init_db(engine) is True
+
+    with engine.connect() as conn:
+        rows = conn.execute(select(SpendingStat.count, SpendingStat.mean, SpendingStat.m2)).all()
+        assert rows == [(2, 200.0, 20000.0)]
+        with pytest.raises(IntegrityError):
+            conn.execute(SpendingStat.__table__.insert().values(user_id=1, category_id=None, count=0, mean=0, m2=0))
+    engine.dispose()
@@ -0,0 +1,55 @@
+import json
+import subprocess
+import sys
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db import init_db
+from app.descriptions import describe
+from app.models import Income, User
+from app.periods import period_range
+from app.statements import chunk_statements, generate, write_statements
+from .conftest import TestingSessionLocal, auth_headers
+
+def test_chunk_matches_per_user_summary(client):
+    users = [auth_headers(client, f"s{i}@example.com") for i in range(3)]
+    food = client.post("/categories", json={"name": "food"}, headers=users[0]).json()["id"]
+    for i, headers in enumerate(users[:2]):
+        client.post("/incomes", json={"description": "salary", "amount": 1000 + i}, headers=headers)
+        client.post("/incomes", json={"description": "gift", "amount": 20}, headers=headers)
+        client.post("/expenses", json={"description": "Lidl", "amount": 12.5 * (i + 1), "category_id": food}, headers=headers)
+        client.post("/expenses", json={"description": "bus", "amount": 2}, headers=headers)
+
+    db = TestingSessionLocal()
+    ids = [u.id for u in db.query(User).order_by(User.id)]
+    start, end, name = period_range("this_month", None, None)
+    statements = chunk_statements(db, ids, start, end, name)
+    db.close()
+
+    for headers, statement in zip(users, statements):
+        summary = client.get("/analytics/summary?period=this_month", headers=headers).json()
+        assert {k: v for k, v in statement.items() if k != "user_id"} == summary
+
+def test_process_pool_writes_one_line_per_user(tmp_path):
+    url = f"sqlite:///{tmp_path}/statements.db"
+    engine = create_engine(url)
+    init_db(engine)
+    db = sessionmaker(bind=engine)()
+    db.add_all(User(id=i, email=f"u{i}@example.com", hashed_password="x", balance_cents=0) for i in range(1, 8))
+    db.flush()
+    db.add_all(Income(user_id=i, description_ref=describe(db, "salary"), amount_cents=100 * i) for i in range(1, 8))
+    db.commit()
+    db.close()
+    engine.dispose()
+
+    start, end, name = period_range("this_month", None, None)
+    out = tmp_path / "statements.ndjson"
+    assert write_statements(str(out), generate(url, [url], start, end, name, workers=2, chunk_size=3)) == 7
+    lines = [json.loads(line) for line in out.read_text().splitlines()]
+    assert [s["user_id"] for s in lines] == list(range(1, 8))
+    assert lines[2]["by_source"] == [{"source": "salary", "total": 3.0}]
+
+def test_workers_do_not_import_the_web_app():
+    check = "import sys, app.statements; assert not {'fastapi', 'app.main', 'app.ratelimit'} & set(sys.modules)"
+    subprocess.run([sys.executable, "-c", check], check=True)
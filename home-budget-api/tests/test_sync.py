@@ -0,0 +1,67 @@
+from .conftest import auth_headers
+
+def test_delta_sync_returns_only_changes_since_cursor(client):
+    headers = auth_headers(client)
+    e1 = client.post("/expenses", json={"description": "pizza", "amount": 50}, headers=headers).json()
+    e2 = client.post("/expenses", json={"description": "fuel", "amount": 30}, headers=headers).json()
+
+    full = client.get("/sync", headers=headers).json()
+    assert full["full"] is True
+    assert {e["id"] for e in full["changes"]["expenses"]} == {e1["id"], e2["id"]}
+    cursor = full["cursor"]
+
+    assert client.get(f"/sync?since={cursor}", headers=headers).json()["changes"]["expenses"] == []
+
+    client.put(f"/expenses/{e1['id']}", json={"description": "pizza", "amount": 55}, headers=headers)
+    client.delete(f"/expenses/{e2['id']}", headers=headers)
+    inc = client.post("/incomes", json={"description": "salary", "amount": 100}, headers=headers).json()
+
+    delta = client.get(f"/sync?since={cursor}", headers=headers).json()
+    assert delta["full"] is False
+    assert [e["amount"] for e in delta["changes"]["expenses"]] == [55.0]
+    assert [i["id"] for i in delta["changes"]["incomes"]] == [inc["id"]]
+    assert delta["deleted"]["expenses"] == [e2["id"]]
+    assert delta["cursor"] > cursor
+
+def test_batched_push_applies_in_one_transaction(client):
+    headers = auth_headers(client)
+    e = client.post("/expenses", json={"description": "rent", "amount": 200}, headers=headers).json()
+
+    r = client.post("/sync", json={"operations": [
+        {"op": "create", "entity": "expense", "client_ref": "a", "description": "coffee", "amount": 5},
+        {"op": "create", "entity": "income", "client_ref": "b", "description": "gift", "amount": 50},
+        {"op": "delete", "entity": "expense", "id": e["id"]},
+    ]}, headers=headers)
+    assert r.status_code == 200, r.text
+    body = r.json()
+    assert body["balance"] == 1000.0 + 50 - 5
+    assert [res["client_ref"] for res in body["results"]] == ["a", "b", None]
+
+    bad = client.post("/sync", json={"operations": [
+        {"op": "create", "entity": "expense", "description": "tea", "amount": 3},
+        {"op": "delete", "entity": "income", "id": 9999},
+    ]}, headers=headers)
+    assert bad.status_code == 404
+    descriptions = [x["description"] for x in client.get("/expenses", headers=headers).json()]
+    assert descriptions == ["coffee"]
+
+def test_sequences_are_per_user_with_a_separate_category_cursor(client):
+    headers = auth_headers(client)
+    r = client.post("/auth/register", json={"email": "other@example.com", "password": "secret123"})
+    other = {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+    mine = client.get("/sync", headers=headers).json()
+    client.post("/expenses", json={"description": "theirs", "amount": 5}, headers=other)
+    assert client.get("/sync", headers=headers).json()["cursor"] == mine["cursor"]
+
+    cat = client.post("/categories", json={"name": "pets"}, headers=other).json()
+    delta = client.get(f"/sync?since={mine['cursor']}&categories_since={mine['categories_cursor']}",
+                       headers=headers).json()
+    assert delta["changes"]["expenses"] == []
+    assert [c["id"] for c in delta["changes"]["categories"]] == [cat["id"]]
+    assert delta["categories_cursor"] > mine["categories_cursor"]
+
+    client.delete(f"/categories/{cat['id']}", headers=other)
+    later = client.get(f"/sync?since={delta['cursor']}&categories_since={delta['categories_cursor']}",
+                       headers=headers).json()
+    assert later["deleted"]["categories"] == [cat["id"]]